@@ -1,12 +1,28 @@
 # RBS TaskHub - Version 2.0 connected via Cursor
+import time
+_script_started = time.perf_counter()  # first thing, so cold-start import time is measured
+
 import streamlit as st
-from supabase import create_client, Client
 import pandas as pd
+import numpy as np
 from datetime import datetime, date, timedelta
-from streamlit_gsheets import GSheetsConnection
-from langchain_google_genai import ChatGoogleGenerativeAI
 from streamlit_option_menu import option_menu
-import time
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+import os
+import json
+import uuid
+import logging
+import functools
+from contextlib import contextmanager
+import hashlib
+import random
+import sys
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+import csv
+import io
+import tempfile
 
 # --- PAGE CONFIGURATION ---
 st.set_page_config(page_title="RBS TaskHub", layout="wide", page_icon="🚀")
@@ -58,39 +74,427 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 # --- CONFIGURATION ---
+APP_VERSION = "2.0"
 COMPANY_DOMAIN = "@rbsgo.com"
 
+def get_setting(name, default=None):
+    # Environment first (benchmarks, CLI jobs), then Streamlit secrets.
+    if name in os.environ: return os.environ[name]
+    try: return st.secrets.get(name, default)
+    except FileNotFoundError: return default
+
+# "supabase" (production) or "local" (SQLite stand-in from local_backend.py)
+BACKEND = get_setting("TASKHUB_BACKEND", "supabase")
+LOCAL_DB_PATH = get_setting("TASKHUB_LOCAL_DB", "taskhub_local.db")
+
+# --- PERFORMANCE INSTRUMENTATION ---
+# Every rerun collects timing spans (db = backend round-trips, frame = pandas
+# work, render = UI sections) plus a request count; managers see them in the
+# sidebar. Fragment reruns are timed as runs of their own (perf_fragment).
+# Anything over its threshold goes to a JSON-lines slow-op log that can be
+# aggregated across sessions and processes.
+SLOW_THRESHOLDS_MS = {
+    "db": float(get_setting("SLOW_DB_MS", 500)),
+    "frame": float(get_setting("SLOW_FRAME_MS", 200)),
+    "render": float(get_setting("SLOW_RENDER_MS", 300)),
+    "rerun": float(get_setting("SLOW_RERUN_MS", 1500)),
+    "startup": float(get_setting("SLOW_STARTUP_MS", 0)),  # 0: log every cold start
+}
+SLOW_LOG_PATH = get_setting("SLOW_LOG_PATH", os.path.join("logs", "slow_ops.jsonl"))
+_perf_lock = threading.Lock()
+
+@st.cache_resource
+def get_slow_op_logger():
+    logger = logging.getLogger("taskhub.slow_ops")
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+    try:
+        os.makedirs(os.path.dirname(SLOW_LOG_PATH) or ".", exist_ok=True)
+        handler = logging.FileHandler(SLOW_LOG_PATH, encoding="utf-8")
+    except OSError:
+        handler = logging.StreamHandler()
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    logger.addHandler(handler)
+    return logger
+
+def _current_perf_run():
+    # None outside a script run (background threads without a context).
+    if get_script_run_ctx(suppress_warning=True) is None: return None
+    return st.session_state.get('perf_run')
+
+def begin_perf_run(started=None, fragment=None):
+    # `started` backdates the run to the top of the script, so the run total
+    # includes executing the module (imports included) as well as main().
+    # `fragment` names the fragment when only that fragment reruns.
+    now = time.perf_counter()
+    spans = [{"name": "script load", "kind": "render", "ms": round((now - started) * 1000, 1)}] if started else []
+    st.session_state['perf_run'] = {"run_id": uuid.uuid4().hex[:12], "started": started or now,
+                                    "spans": spans, "requests": 0, "section": None, "fragment": fragment}
+
+def log_slow_op(kind, name, ms, run=None):
+    record = {"ts": datetime.now().isoformat(timespec="milliseconds"), "kind": kind, "name": name,
+              "ms": round(ms, 1), "threshold_ms": SLOW_THRESHOLDS_MS[kind]}
+    if run is not None:
+        record.update(run_id=run["run_id"], user=st.session_state.get('user'), requests=run["requests"])
+        if run.get("fragment"): record["fragment"] = run["fragment"]
+    get_slow_op_logger().info(json.dumps(record))
+
+def record_span(name, kind, ms):
+    run = _current_perf_run()
+    if run is not None:
+        with _perf_lock:
+            run["spans"].append({"name": name, "kind": kind, "ms": round(ms, 1)})
+            if kind == "db": run["requests"] += 1
+    if ms >= SLOW_THRESHOLDS_MS[kind]: log_slow_op(kind, name, ms, run)
+
+@contextmanager
+def perf_span(name, kind="frame"):
+    start = time.perf_counter()
+    try: yield
+    finally: record_span(name, kind, (time.perf_counter() - start) * 1000)
+
+def traced(name, kind="frame"):
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with perf_span(name, kind): return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def perf_section(name):
+    # Lap timer for the sequential render sections of main(): closes the open
+    # section and starts `name` (None just closes).
+    run = _current_perf_run()
+    if run is None: return
+    now = time.perf_counter()
+    if run["section"]:
+        open_name, started = run["section"]
+        record_span(open_name, "render", (now - started) * 1000)
+    run["section"] = (name, now) if name else None
+
+@st.cache_resource
+def get_startup_stats():
+    # Filled by the first run this process completes (see finish_perf_run).
+    return {}
+
+def _record_startup(run):
+    stats = get_startup_stats()
+    with _perf_lock:
+        if stats: return
+        load_ms = next((s["ms"] for s in run["spans"] if s["name"] == "script load"), None)
+        stats.update(version=APP_VERSION, import_ms=load_ms, first_render_ms=run["total_ms"])
+    if run["total_ms"] >= SLOW_THRESHOLDS_MS["startup"]:
+        record = {"ts": datetime.now().isoformat(timespec="milliseconds"), "kind": "startup",
+                  "name": "cold start", "ms": run["total_ms"], **stats}
+        get_slow_op_logger().info(json.dumps(record))
+
+def finish_perf_run():
+    run = _current_perf_run()
+    if run is None: return
+    perf_section(None)
+    total = (time.perf_counter() - run["started"]) * 1000
+    run["total_ms"] = round(total, 1)
+    if run.get("fragment"):
+        if total >= SLOW_THRESHOLDS_MS["rerun"]: log_slow_op("rerun", f"fragment rerun: {run['fragment']}", total, run)
+        return
+    if total >= SLOW_THRESHOLDS_MS["rerun"]: log_slow_op("rerun", "full rerun", total, run)
+    _record_startup(run)
+
+def perf_fragment(name):
+    # st.fragment whose own reruns get a perf run of their own, tagged with
+    # `name`, instead of adding their spans to the last (finished) full run.
+    # During a full run, or inside a fragment that already started one, the
+    # current run is still open and the spans simply join it.
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            run = _current_perf_run()
+            if run is None or "total_ms" not in run: return fn(*args, **kwargs)
+            begin_perf_run(fragment=name)
+            try: return fn(*args, **kwargs)
+            finally: finish_perf_run()
+        return st.fragment(wrapper)
+    return decorator
+
+def render_perf_panel(slot):
+    run = _current_perf_run()
+    if run is None: return
+    perf_section(None)
+    elapsed = (time.perf_counter() - run["started"]) * 1000
+    with slot.container():
+        with st.expander(f"⏱️ {elapsed:.0f} ms · {run['requests']} requests", expanded=False):
+            spans = pd.DataFrame(run["spans"], columns=["name", "kind", "ms"])
+            if not spans.empty:
+                st.caption(" · ".join(f"{k}: {v:.0f} ms" for k, v in spans.groupby("kind")["ms"].sum().items()))
+                st.dataframe(spans.sort_values("ms", ascending=False), hide_index=True, use_container_width=True)
+            startup = get_startup_stats()
+            if startup:
+                st.caption(f"Cold start (v{startup['version']}): import {startup['import_ms'] or 0:.0f} ms, "
+                           f"first render {startup['first_render_ms']:.0f} ms")
+
+# --- BACKEND CLIENT ---
+# Every backend call goes through _TimedQuery.execute(). The HTTP client is one
+# pooled keep-alive connection set with a timeout on each call (init_supabase).
+# Reads (selects and READ_ONLY_RPCS) are retried with jittered backoff inside a
+# fixed time budget; a process-wide circuit breaker fails fast while the
+# backend is down, and reads that still fail are answered from the last good
+# response when there is one. Writes are never retried.
+DB_TIMEOUT_S = float(get_setting("DB_TIMEOUT_S", 10))
+DB_CONNECT_TIMEOUT_S = float(get_setting("DB_CONNECT_TIMEOUT_S", 3))
+DB_POOL_SIZE = int(get_setting("DB_POOL_SIZE", 20))
+DB_READ_RETRIES = int(get_setting("DB_READ_RETRIES", 2))
+DB_RETRY_BACKOFF_S = float(get_setting("DB_RETRY_BACKOFF_S", 0.25))
+DB_READ_BUDGET_S = float(get_setting("DB_READ_BUDGET_S", 15))  # one read, retries included
+DB_BREAKER_FAILURES = int(get_setting("DB_BREAKER_FAILURES", 5))
+DB_BREAKER_RESET_S = float(get_setting("DB_BREAKER_RESET_S", 30))
+LAST_GOOD_ENTRIES = 256
+LAST_GOOD_MAX_ROWS = 5000  # bigger reads (full task loads) keep their own copy, see SharedTaskStore
+READ_ONLY_RPCS = {"task_bucket_counts", "search_tasks", "task_completions_per_week"}
+RETRY_STATUS_CODES = {"408", "429", "500", "502", "503", "504", "520"}
+
+class BackendUnavailable(Exception):
+    """The backend could not be reached and there was no earlier answer to fall back on."""
+
+def is_transient(error):
+    # Worth retrying: the request never got a real answer (connection drop,
+    # timeout, locked SQLite file) or the gateway said to try again.
+    httpx = sys.modules.get("httpx")
+    if httpx is not None and isinstance(error, httpx.TransportError): return True
+    if isinstance(error, (ConnectionError, TimeoutError)): return True
+    if type(error).__name__ == "OperationalError" and "locked" in str(error): return True
+    return str(getattr(error, "code", "")) in RETRY_STATUS_CODES
+
+@st.cache_resource
+def get_backend_logger():
+    # Outages are logged once per breaker transition (CircuitBreaker.record);
+    # the individual failed reads only at DEBUG (BACKEND_LOG_LEVEL).
+    logger = logging.getLogger("taskhub.backend")
+    logger.setLevel(get_setting("BACKEND_LOG_LEVEL", "WARNING").upper())
+    logger.propagate = False
+    handler = logging.StreamHandler()
+    handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+    logger.addHandler(handler)
+    return logger
+
+def note_backend_error(label, error, stale):
+    # Logged, and collected for the session's notice banner (see
+    # render_backend_notices). No st.* call here: this runs inside cached functions.
+    # Connection trouble is the breaker's to report; real errors are logged each time.
+    level = logging.DEBUG if stale or is_transient(error) or isinstance(error, BackendUnavailable) else logging.WARNING
+    get_backend_logger().log(level, "Backend error on %s (%s): %s", label,
+                             "served last good data" if stale else "no fallback", error)
+    run = _current_perf_run()
+    if run is None: return
+    message = (f"Database unreachable ({label}); showing the last data we had." if stale
+               else f"Database error ({label}): {error}")
+    with _perf_lock: run.setdefault("backend_errors", {}).setdefault(label, message)
+
+def render_backend_notices(slot):
+    run = _current_perf_run()
+    notices = run.get("backend_errors") if run else None
+    if notices: slot.warning("  \n".join(notices.values()), icon="🔌")
+
+class CircuitBreaker:
+    # Opens after `threshold` consecutive transient failures; while open every
+    # call fails fast. After `reset_after` one probe call is let through and
+    # its outcome closes the breaker or keeps it open for another period.
+    def __init__(self, threshold=DB_BREAKER_FAILURES, reset_after=DB_BREAKER_RESET_S):
+        self.threshold, self.reset_after = threshold, reset_after
+        self.lock = threading.Lock()
+        self.failures = 0
+        self.opened_at = None
+
+    @property
+    def is_open(self):
+        return self.opened_at is not None
+
+    def allow(self):
+        with self.lock:
+            if self.opened_at is None: return True
+            if time.time() - self.opened_at < self.reset_after: return False
+            self.opened_at = time.time()  # half-open: this caller is the probe
+            return True
+
+    def record(self, ok, error=None):
+        with self.lock:
+            if ok:
+                if self.opened_at is not None: get_backend_logger().warning("Backend reachable again, circuit closed")
+                self.failures, self.opened_at = 0, None
+                return
+            self.failures += 1
+            if self.failures >= self.threshold:
+                if self.opened_at is None:
+                    get_backend_logger().warning("Circuit breaker open after %d failures: %s", self.failures, error)
+                self.opened_at = time.time()
+
+class _TimedQuery:
+    # Wraps a supabase-py request builder; every call is passed through and
+    # recorded (the chain doubles as the last-good cache key), and .execute()
+    # is timed, labelled "<table>.<action>".
+    ACTIONS = ("select", "insert", "update", "upsert", "delete")
+
+    def __init__(self, builder, table, label, client, calls=(), stale_ok=True):
+        self._builder, self._table, self._label = builder, table, label
+        self._client, self._calls, self._stale_ok = client, calls, stale_ok
+
+    @property
+    def is_read(self):
+        return self._label.endswith(".select") or self._label[len("rpc."):] in READ_ONLY_RPCS
+
+    def fresh(self):
+        # Never answer this query from the last-good cache (e.g. delta sync,
+        # which would misread an old answer as the current state).
+        return _TimedQuery(self._builder, self._table, self._label, self._client, self._calls, stale_ok=False)
+
+    def execute(self, *args, **kwargs):
+        # postgrest-py's own retry sleeps up to 7s unjittered; ours replaces it.
+        if hasattr(self._builder, "retry"): self._builder.retry(False)
+        key = repr((self._label, self._calls)) if self.is_read else None
+        return self._client.execute(self._label, lambda: self._builder.execute(*args, **kwargs),
+                                    key, self._stale_ok)
+
+    def __getattr__(self, attr):
+        value = getattr(self._builder, attr)
+        if not callable(value): return value
+        def call(*args, **kwargs):
+            result = value(*args, **kwargs)
+            if not hasattr(result, "execute"): return result
+            label = f"{self._table}.{attr}" if attr in self.ACTIONS else self._label
+            return _TimedQuery(result, self._table, label, self._client,
+                               self._calls + ((attr, args, kwargs),), self._stale_ok)
+        return call
+
+class InstrumentedClient:
+    def __init__(self, client):
+        self.client = client
+        self.breaker = CircuitBreaker()
+        self._last_good = OrderedDict()  # query key -> last successful response (reads only)
+        self._last_good_lock = threading.Lock()
+
+    def table(self, name):
+        return _TimedQuery(self.client.table(name), name, f"{name}.select", self)
+
+    def rpc(self, name, params=None, **kwargs):
+        # The params are part of the last-good key: a fallback must never answer
+        # one user's search or counts with another's.
+        return _TimedQuery(self.client.rpc(name, params or {}, **kwargs), name, f"rpc.{name}", self,
+                           calls=(("rpc", (name, params or {}), kwargs),))
+
+    def execute(self, label, call, key=None, stale_ok=True):
+        # `key` is set for reads: only those are retried and cached.
+        if not self.breaker.allow():
+            return self._fallback(label, key, stale_ok, BackendUnavailable(f"{label}: backend unavailable (circuit open)"))
+        deadline = time.perf_counter() + DB_READ_BUDGET_S
+        attempt = 0
+        while True:
+            try:
+                with perf_span(label, "db"): response = call()
+            except Exception as e:
+                if not is_transient(e):
+                    # A real answer from a live backend (bad query, permissions...).
+                    self.breaker.record(True)
+                    raise
+                delay = random.uniform(0, DB_RETRY_BACKOFF_S * 2 ** attempt)  # full jitter
+                if (key is not None and attempt < DB_READ_RETRIES and not self.breaker.is_open
+                        and time.perf_counter() + delay + DB_TIMEOUT_S <= deadline):
+                    attempt += 1
+                    time.sleep(delay)
+                    continue
+                self.breaker.record(False, e)
+                if key is None: raise
+                return self._fallback(label, key, stale_ok, e)
+            self.breaker.record(True)
+            if key is not None: self._remember(key, response)
+            return response
+
+    def _remember(self, key, response):
+        data = getattr(response, "data", None)
+        if isinstance(data, list) and len(data) > LAST_GOOD_MAX_ROWS: return
+        with self._last_good_lock:
+            self._last_good[key] = response
+            self._last_good.move_to_end(key)
+            while len(self._last_good) > LAST_GOOD_ENTRIES: self._last_good.popitem(last=False)
+
+    def _fallback(self, label, key, stale_ok, error):
+        with self._last_good_lock:
+            cached = self._last_good.get(key) if key is not None and stale_ok else None
+        # Callers of fresh() queries report the failure themselves.
+        if stale_ok: note_backend_error(label, error, stale=cached is not None)
+        else: get_backend_logger().debug("Backend error on %s: %s", label, error)
+        if cached is not None: return cached
+        if isinstance(error, BackendUnavailable): raise error
+        raise BackendUnavailable(f"{label}: {error}") from error
+
+    def __getattr__(self, attr):
+        return getattr(self.client, attr)
+
 # --- SECURE CONNECTION ---
-try:
-    SUPABASE_URL = st.secrets["connections.supabase"]["SUPABASE_URL"]
-    SUPABASE_KEY = st.secrets["connections.supabase"]["SUPABASE_KEY"]
-except:
+def load_supabase_credentials():
+    # Environment / top-level secrets first (get_setting), so a run can be
+    # pointed at another server, e.g. a local fake one; then the connection section.
+    url, key = get_setting("SUPABASE_URL"), get_setting("SUPABASE_KEY")
+    if url and key: return url, key
     try:
-        SUPABASE_URL = st.secrets["SUPABASE_URL"]
-        SUPABASE_KEY = st.secrets["SUPABASE_KEY"]
-    except:
+        return st.secrets["connections.supabase"]["SUPABASE_URL"], st.secrets["connections.supabase"]["SUPABASE_KEY"]
+    except (KeyError, FileNotFoundError):
         st.error("🚨 Secrets not found!")
         st.stop()
 
 @st.cache_resource
 def init_supabase():
-    return create_client(SUPABASE_URL, SUPABASE_KEY)
+    # Anything exposing the supabase-py `.table()` / `.rpc()` builders works here.
+    if BACKEND == "local":
+        from local_backend import LocalBackend
+        return InstrumentedClient(LocalBackend(LOCAL_DB_PATH))
+    import httpx  # deferred: not needed by the local backend
+    from supabase import ClientOptions, create_client
+    supabase_url, supabase_key = load_supabase_credentials()
+    # One keep-alive pool shared by every session and worker thread; the
+    # timeout bounds each call (connect separately, so a dead host fails fast).
+    http_client = httpx.Client(
+        timeout=httpx.Timeout(DB_TIMEOUT_S, connect=DB_CONNECT_TIMEOUT_S),
+        limits=httpx.Limits(max_connections=DB_POOL_SIZE, max_keepalive_connections=DB_POOL_SIZE),
+        follow_redirects=True,
+    )
+    options = ClientOptions(httpx_client=http_client)
+    return InstrumentedClient(create_client(supabase_url, supabase_key, options=options))
 
 supabase = init_supabase()
 
+def set_backend(client):
+    # Swap the data backend at runtime (benchmarks, scripted runs).
+    global supabase
+    supabase = client if isinstance(client, InstrumentedClient) else InstrumentedClient(client)
+
 # --- AUTHENTICATION & MASTERS ---
+@st.cache_data(ttl=300)
+def get_user_directory():
+    # Whole user_master indexed by email; shared by login, Team Master and the
+    # assignee dropdowns. Errors propagate so a failed fetch is never cached.
+    response = supabase.table("user_master").select("*").order("name").execute()
+    users = response.data or []
+    return {
+        "by_email": {u['email']: u for u in users},
+        "active": [u['email'] for u in users if u.get('status') == 'active'],
+    }
+
 def verify_user_in_db(email):
-    try:
-        response = supabase.table("user_master").select("*").eq("email", email).eq("status", "active").execute()
-        if response.data: return response.data[0]
-        return None
-    except: return None
+    # None means "not an active user"; backend errors propagate so the login
+    # page can tell the two apart.
+    user = get_user_directory()["by_email"].get(email)
+    if user: return user if user.get('status') == 'active' else None
+    # Not in the cached directory: may have been added since the last refresh.
+    response = supabase.table("user_master").select("*").eq("email", email).eq("status", "active").execute()
+    if response.data:
+        get_user_directory.clear()
+        return response.data[0]
+    return None
 
 def get_active_users():
-    try:
-        response = supabase.table("user_master").select("email").eq("status", "active").execute()
-        return [u['email'] for u in response.data] if response.data else []
-    except: return []
+    try: return list(get_user_directory()["active"])
+    except Exception as e:
+        note_backend_error("user_master.select", e, stale=False)
+        return []
 
 def create_new_user(email, name, role):
     try:
@@ -98,6 +502,7 @@ def create_new_user(email, name, role):
         if exists.data: return False, "User already exists!"
         data = {"email": email, "name": name, "role": role, "status": "active"}
         supabase.table("user_master").insert(data).execute()
+        get_user_directory.clear()
         return True, "User added successfully!"
     except Exception as e: return False, str(e)
 
@@ -105,82 +510,832 @@ def toggle_user_status(email, current_status):
     try:
         new_status = "inactive" if current_status == "active" else "active"
         supabase.table("user_master").update({"status": new_status}).eq("email", email).execute()
+        get_user_directory.clear()
         return True
-    except: return False
+    except Exception as e:
+        st.error(f"Status change failed: {e}")
+        return False
 
 # --- GEMINI AI ---
-def get_ai_summary(task_dataframe):
+AI_MODEL = "gemini-pro"
+AI_TOKEN_BUDGET = int(get_setting("AI_TOKEN_BUDGET", 1500))
+AI_CHARS_PER_TOKEN = 4  # rough estimate, good enough for budgeting
+AI_CACHE_SIZE = 64
+AI_TOP_PROJECTS = 15  # project lines in the summary prompt
+AI_TOP_OVERDUE = 10   # overdue items in the summary prompt, always kept ahead of projects
+AI_PROMPT_HEADER = "Act as Project Manager. Summarize:\n1. Critical Bottlenecks\n2. Focus\n3. Motivation\n"
+
+@st.cache_resource
+def get_llm_client(api_key):
+    # Imported on first use: langchain adds over a second to a cold start.
+    from langchain_google_genai import ChatGoogleGenerativeAI
+    return ChatGoogleGenerativeAI(model=AI_MODEL, google_api_key=api_key)
+
+@st.cache_resource
+def _ai_summary_cache():
+    return OrderedDict()
+
+def task_set_hash(task_dataframe):
+    cols = [c for c in ["id", "status", "due_date", "task_desc", "project_ref", "assigned_to", "updated_at"] if c in task_dataframe.columns]
+    hashed = pd.util.hash_pandas_object(task_dataframe[cols].astype(str), index=False).values
+    return hashlib.sha256(hashed.tobytes()).hexdigest()
+
+def _fit_lines(lines, budget):
+    kept, used = [], 0
+    for line in lines:
+        if used + len(line) + 1 > budget: break
+        kept.append(line); used += len(line) + 1
+    return kept, used
+
+@traced("ai prompt")
+def build_summary_prompt(task_dataframe, token_budget=AI_TOKEN_BUDGET):
+    # Pre-aggregated digest instead of the raw frame. Each section is capped
+    # (AI_TOP_PROJECTS, AI_TOP_OVERDUE) and the character budget is spent on
+    # totals first, then the most overdue items, then the project breakdown,
+    # so a long project list can never crowd the overdue items out.
+    budget = token_budget * AI_CHARS_PER_TOKEN - len(AI_PROMPT_HEADER)
+    df = task_dataframe
+    today_ts = pd.Timestamp.now().normalize()
+    active = df[df['status'] != 'Completed']
+    overdue = active[active['due_date'] < today_ts].sort_values('due_date')
+
+    totals = [f"Totals: {len(df)} tasks, {len(active)} open, {len(overdue)} overdue, "
+              f"{int((active['due_date'] == today_ts).sum())} due today, {len(df) - len(active)} completed",
+              "Status counts: " + ", ".join(f"{k}={v}" for k, v in df['status'].value_counts().items())]
+    late = []
+    if not overdue.empty:
+        late.append("Most overdue:")
+        for r in overdue.head(AI_TOP_OVERDUE).itertuples():
+            who = f", {r.assigned_to.split('@')[0]}" if isinstance(r.assigned_to, str) else ""
+            late.append(f"- {r.due_date:%d-%b} | {str(r.task_desc)[:80]} ({r.project_ref}{who})")
+    projects = []
+    if not active.empty:
+        by_proj = active.assign(late=active['due_date'] < today_ts).groupby('project_ref', observed=True)['late'].agg(['size', 'sum'])
+        by_proj = by_proj[by_proj['size'] > 0].sort_values(['sum', 'size'], ascending=False)
+        projects.append("Open by project (open/overdue):")
+        projects += [f"- {proj}: {int(r['size'])}/{int(r['sum'])}" for proj, r in by_proj.head(AI_TOP_PROJECTS).iterrows()]
+        if len(by_proj) > AI_TOP_PROJECTS: projects.append(f"- ({len(by_proj) - AI_TOP_PROJECTS} more projects)")
+
+    totals, used = _fit_lines(totals, budget)
+    late, used_late = _fit_lines(late, budget - used)
+    projects, _ = _fit_lines(projects, budget - used - used_late)
+    if len(late) == 1: late = []          # heading without any item
+    if len(projects) == 1: projects = []
+    return AI_PROMPT_HEADER + "Tasks:\n" + "\n".join(totals + projects + late)
+
+def _stream_summary(llm, prompt, key):
+    chunks = []
+    try:
+        for chunk in llm.stream(prompt):
+            text = getattr(chunk, "content", chunk)
+            chunks.append(text)
+            yield text
+    except Exception as e:
+        yield f"AI Error: {str(e)}"
+        return
+    _remember_summary(key, "".join(chunks))
+
+def _remember_summary(key, text):
+    cache = _ai_summary_cache()
+    cache[key] = text
+    while len(cache) > AI_CACHE_SIZE: cache.popitem(last=False)
+
+def get_ai_summary(task_dataframe, llm=None, stream=False):
+    # Returns the summary text, or a chunk generator for st.write_stream when
+    # stream=True. Pass `llm` (anything with invoke/stream) to bypass Gemini.
     try:
-        if "GOOGLE_API_KEY" in st.secrets:
-            api_key = st.secrets["GOOGLE_API_KEY"]
-        else: return "⚠️ Google API Key missing."
-        llm = ChatGoogleGenerativeAI(model="gemini-pro", google_api_key=api_key)
-        task_text = task_dataframe.to_string(index=False)
-        prompt = f"Act as Project Manager. Summarize:\n1. Critical Bottlenecks\n2. Focus\n3. Motivation\nTasks: {task_text}"
+        if task_dataframe.empty: return "No tasks to summarize."
+        key = task_set_hash(task_dataframe)
+        cached = _ai_summary_cache().get(key)
+        if cached is not None: return iter([cached]) if stream else cached
+
+        if llm is None:
+            api_key = get_setting("GOOGLE_API_KEY")
+            if not api_key: return "⚠️ Google API Key missing."
+            llm = get_llm_client(api_key)
+        prompt = build_summary_prompt(task_dataframe)
+        if stream: return _stream_summary(llm, prompt, key)
         response = llm.invoke(prompt)
+        _remember_summary(key, response.content)
         return response.content
     except Exception as e: return f"AI Error: {str(e)}"
 
 # --- SYNC LOGIC ---
-def sync_projects():
-    try:
-        conn = st.connection("gsheets", type=GSheetsConnection)
-        df = conn.read(worksheet="ROADMAP", ttl=0) 
-        if df.empty: return False, "⚠️ Sheet is empty or missing 'ROADMAP' tab."
-
-        df = df.fillna("").astype(str)
-        count = 0
-        for index, row in df.iterrows():
-            if row.get('Interface Name', '').strip() == '': continue
-            p_name = row.get('Interface Name', '').strip()
-            p_status = row.get('Status', '').strip()
-            p_desc = row.get('Particulars', '').strip()
-            p_vendor = row.get('Vendor', '').strip()
-            data = { "name": p_name, "status": p_status, "description": p_desc, "vendor": p_vendor }
-            try:
-                supabase.table("projects").upsert(data, on_conflict="name").execute()
-                count += 1
+# Roadmap sheet column -> projects column
+ROADMAP_COLUMNS = {"Interface Name": "name", "Status": "status", "Particulars": "description", "Vendor": "vendor"}
+PROJECT_FIELDS = list(ROADMAP_COLUMNS.values())
+SYNC_CHUNK_SIZE = 500
+
+def read_roadmap_sheet():
+    from streamlit_gsheets import GSheetsConnection  # deferred like the AI client
+    conn = st.connection("gsheets", type=GSheetsConnection)
+    return conn.read(worksheet="ROADMAP", ttl=0)
+
+def normalize_projects(df, columns=None):
+    # Vectorized clean-up shared by the sheet and the current table so both
+    # sides hash identically: string-typed, stripped, unnamed rows dropped and
+    # duplicate names collapsed to the last occurrence (as row-by-row upserts did).
+    if columns: df = df.reindex(columns=list(columns)).rename(columns=columns)
+    df = df.reindex(columns=PROJECT_FIELDS).fillna("").astype(str)
+    for col in PROJECT_FIELDS: df[col] = df[col].str.strip()
+    df = df[df['name'] != ""]
+    return df.drop_duplicates(subset="name", keep="last").reset_index(drop=True)
+
+def _content_hash(df):
+    return pd.util.hash_pandas_object(df[PROJECT_FIELDS], index=False).values
+
+def diff_projects(sheet_df, current_df):
+    # Returns the sheet frame with an `action` column: insert / update / unchanged.
+    sheet_df = sheet_df.assign(_hash=_content_hash(sheet_df))
+    if current_df.empty:
+        return sheet_df.assign(action="insert").drop(columns="_hash")
+    current = pd.DataFrame({"name": current_df['name'], "_old_hash": _content_hash(current_df)})
+    merged = sheet_df.merge(current, on="name", how="left")
+    merged['action'] = np.where(merged['_old_hash'].isna(), "insert",
+                                np.where(merged['_hash'] == merged['_old_hash'], "unchanged", "update"))
+    return merged.drop(columns=["_hash", "_old_hash"])
+
+def _upsert_projects(records, report):
+    for start in range(0, len(records), SYNC_CHUNK_SIZE):
+        chunk = records[start:start + SYNC_CHUNK_SIZE]
+        try:
+            supabase.table("projects").upsert(chunk, on_conflict="name").execute()
+            continue
+        except Exception as chunk_error:
+            print(f"Chunk at {start} failed, retrying row by row: {chunk_error}")
+        # Isolate the bad rows so one failure doesn't sink the whole chunk.
+        for row in chunk:
+            try: supabase.table("projects").upsert(row, on_conflict="name").execute()
             except Exception as row_error:
-                print(f"Row skipped {p_name}: {row_error}")
-                continue
-        get_projects_master.clear()
-        return True, f"✅ Synced {count} Projects!"
+                report["failed"].append({"name": row["name"], "error": str(row_error)})
+
+def sync_projects(df=None):
+    report = {"inserted": 0, "updated": 0, "unchanged": 0, "failed": []}
+    try:
+        if df is None: df = read_roadmap_sheet()
+        if df.empty: return False, "⚠️ Sheet is empty or missing 'ROADMAP' tab.", report
+
+        sheet_df = normalize_projects(df, ROADMAP_COLUMNS)
+        current = supabase.table("projects").select(",".join(PROJECT_FIELDS)).execute().data or []
+        diffed = diff_projects(sheet_df, normalize_projects(pd.DataFrame(current, columns=PROJECT_FIELDS)))
+
+        pending = diffed[diffed['action'] != "unchanged"]
+        _upsert_projects(pending[PROJECT_FIELDS].to_dict('records'), report)
+
+        failed_names = {f["name"] for f in report["failed"]}
+        ok = pending[~pending['name'].isin(failed_names)]
+        report["inserted"] = int((ok['action'] == "insert").sum())
+        report["updated"] = int((ok['action'] == "update").sum())
+        report["unchanged"] = int((diffed['action'] == "unchanged").sum())
+        if len(pending): get_project_names.clear()
+        msg = f"✅ Synced Projects: {report['inserted']} new, {report['updated']} updated, {report['unchanged']} unchanged"
+        if report["failed"]: msg += f", {len(report['failed'])} failed"
+        return True, msg + "!", report
     except Exception as e:
-        return False, f"❌ Sync Error: {str(e)}"
+        return False, f"❌ Sync Error: {str(e)}", report
+
+# --- BACKGROUND ROADMAP SYNC ---
+# One daemon thread per server process polls the ROADMAP tab and only runs the
+# upsert (and clears get_project_names) when the sheet content changed.
+ROADMAP_SYNC_INTERVAL = int(get_setting("ROADMAP_SYNC_INTERVAL", 900))  # seconds, 0 disables
+# The first poll (and the gsheets import) waits so it doesn't compete with the
+# cold start's first render.
+ROADMAP_SYNC_START_DELAY = int(get_setting("ROADMAP_SYNC_START_DELAY", 30))
+
+def roadmap_fingerprint(df):
+    return hashlib.sha256(df.to_csv(index=False).encode("utf-8")).hexdigest()
+
+class RoadmapSyncWorker:
+    def __init__(self, interval):
+        self.interval = interval
+        self.fingerprint = None
+        self.last_checked = None
+        self.last_result = "Waiting for first check"
+        self._stop = threading.Event()
+        self.thread = threading.Thread(target=self._run, name="roadmap-sync", daemon=True)
+
+    def poll_once(self):
+        df = read_roadmap_sheet()
+        fingerprint = roadmap_fingerprint(df)
+        self.last_checked = datetime.now()
+        if fingerprint == self.fingerprint: return None
+        ok, msg, report = sync_projects(df)
+        # Keep the old fingerprint on failure so the next poll retries.
+        if ok and not report["failed"]: self.fingerprint = fingerprint
+        self.last_result = msg
+        return report
+
+    def _run(self):
+        self._stop.wait(ROADMAP_SYNC_START_DELAY)
+        while not self._stop.is_set():
+            try: self.poll_once()
+            except Exception as e:
+                self.last_result = f"❌ Sync Error: {str(e)}"
+                print(f"Roadmap sync failed: {e}")
+            self._stop.wait(self.interval)
+
+    def stop(self):
+        self._stop.set()
+
+@st.cache_resource
+def start_roadmap_sync_worker():
+    if ROADMAP_SYNC_INTERVAL <= 0: return None
+    worker = RoadmapSyncWorker(ROADMAP_SYNC_INTERVAL)
+    worker.thread.start()
+    return worker
 
 # --- OPTIMIZED DATA LOADING ---
 @st.cache_data(ttl=300)
+def get_project_names():
+    # Errors propagate so a failed fetch is never cached.
+    response = supabase.table("projects").select("name").execute()
+    return [row['name'] for row in response.data] if response.data else []
+
 def get_projects_master():
-    try:
-        response = supabase.table("projects").select("name").execute()
-        return [row['name'] for row in response.data] if response.data else []
-    except: return []
+    try: return get_project_names()
+    except Exception as e:
+        note_backend_error("projects.select", e, stale=False)
+        return []
 
-def load_data_efficiently(target_email=None):
-    query = supabase.table("tasks").select("*").order("due_date", desc=False)
-    if target_email: query = query.eq("assigned_to", target_email)
-    response = query.execute()
-    df = pd.DataFrame(response.data) if response.data else pd.DataFrame()
+# --- TASK SNAPSHOT (DELTA SYNC) ---
+# One process-wide task store (SharedTaskStore below) holds the list frames,
+# partitioned by assignee, plus a cursor on `updated_at`. Syncs only pull rows
+# changed since that cursor and are shared by every session.
+# Needs the `updated_at` column/trigger from sql/001_tasks_updated_at.sql.
+TASK_CURSOR_COL = "updated_at"
+TASK_STORE_SYNC_INTERVAL = float(get_setting("TASK_STORE_SYNC_INTERVAL", 5))  # seconds between shared syncs
+TASK_CURSOR_OVERLAP_S = float(get_setting("TASK_CURSOR_OVERLAP_S", 10))  # re-read window, see SharedTaskStore._sync
 
+# List views only carry the columns needed to bucket and draw summary rows;
+# the long text fields are fetched per task when its editor opens.
+TASK_LIST_COLUMNS = ["id", "created_by", "assigned_to", "task_desc", "status", "priority",
+                     "due_date", "project_ref", "coordinator", "completed_at", TASK_CURSOR_COL]
+TASK_DETAIL_COLUMNS = ["staff_remarks", "manager_remarks", "points", "email_subject"]
+TASK_LIST_SELECT = ",".join(TASK_LIST_COLUMNS)
+TASK_CATEGORY_COLUMNS = ["status", "priority", "project_ref", "coordinator", "assigned_to"]
+BUCKET_CATEGORIES = ["Overdue", "Today", "Tomorrow", "Later", "Completed"]
+
+def _compact_dtypes(df):
+    for col in TASK_CATEGORY_COLUMNS:
+        if col in df.columns and not isinstance(df[col].dtype, pd.CategoricalDtype):
+            df[col] = df[col].astype("category")
+    return df
+
+def _with_date_bucket(df):
+    df['date_bucket'] = pd.Categorical(bucket_labels(df), categories=BUCKET_CATEGORIES)
+    return df
+
+@traced("task frame")
+def _prepare_task_frame(rows):
+    df = pd.DataFrame(rows) if rows else pd.DataFrame()
     if not df.empty:
         # Critical Fix: Date Handling
         df['due_date'] = pd.to_datetime(df['due_date'], errors='coerce')
         df['due_date'] = df['due_date'].fillna(pd.Timestamp.now().normalize())
-        
+        df = _with_date_bucket(_compact_dtypes(df))
+    return df
+
+def task_records(df):
+    # Row dicts for the UI, with pandas NaN (e.g. from categoricals) as None.
+    return df.astype(object).where(df.notna(), None).to_dict('records')
+
+@st.cache_data(ttl=3600, max_entries=256)
+def get_task_details(task_id, version=None):
+    # `version` is the row's updated_at, so an edited task misses the cache.
+    response = supabase.table("tasks").select(",".join(TASK_DETAIL_COLUMNS)).eq("id", task_id).execute()
+    return response.data[0] if response.data else {}
+
+# The store's working set is open work plus recent completions; older closed
+# tasks are paged from `task_history` on demand (sql/005_task_archive.sql).
+COMPLETED_WINDOW_DAYS = int(get_setting("COMPLETED_WINDOW_DAYS", 30))
+
+def completed_cutoff():
+    return str(date.today() - timedelta(days=COMPLETED_WINDOW_DAYS))
+
+def in_completed_window(row, cutoff=None):
+    if row.get('status') != "Completed": return True
+    return str(row.get('completed_at') or "") >= (cutoff or completed_cutoff())
+
+def open_tasks(query):
+    # Anything not Completed, a NULL status included, as task_bucket_counts
+    # counts it (sql/002: `status is distinct from 'Completed'`).
+    return query.or_("status.is.null,status.neq.Completed")
+
+def _working_set(query):
+    return query.or_(f"status.is.null,status.neq.Completed,completed_at.gte.{completed_cutoff()}")
+
+def _fetch_all_tasks(target_email=None):
+    query = _working_set(supabase.table("tasks").select(TASK_LIST_SELECT)).order("due_date", desc=False)
+    if target_email: query = query.eq("assigned_to", target_email)
+    return query.execute().data or []
+
+def _fetch_changed_tasks(since):
+    # No assignee filter on purpose: a task reassigned away from a loaded
+    # partition must still show up here so it can be moved out of it.
+    response = supabase.table("tasks").fresh().select(TASK_LIST_SELECT).gte(TASK_CURSOR_COL, since).execute()
+    return response.data or []
+
+def _stamp_ts(value):
+    ts = pd.Timestamp(value, unit='s') if isinstance(value, float) else pd.Timestamp(value)
+    return ts.tz_localize("UTC") if ts.tzinfo is None else ts
+
+def _count_tasks(assignees=None):
+    query = _working_set(supabase.table("tasks").fresh().select("id", count="exact")).limit(1)
+    if assignees is not None: query = query.in_("assigned_to", assignees)
+    return query.execute().count
+
+def _fetch_task_ids(assignees=None):
+    # Also how tasks ageing out of the completed window leave the store.
+    query = _working_set(supabase.table("tasks").fresh().select("id"))
+    if assignees is not None: query = query.in_("assigned_to", assignees)
+    return {row['id'] for row in (query.execute().data or [])}
+
+def _snapshot_cursor(df):
+    if df.empty or TASK_CURSOR_COL not in df.columns: return None
+    stamps = df[TASK_CURSOR_COL].dropna()
+    return stamps.max() if not stamps.empty else None
+
+def _merge_rows(df, rows):
+    # Replace/insert `rows` by id, keeping the frame sorted by due date.
+    changed_ids = {r['id'] for r in rows}
+    parts = [df[~df['id'].isin(changed_ids)]] if not df.empty else []
+    if rows: parts.append(_prepare_task_frame(rows))
+    parts = [p for p in parts if not p.empty]
+    df = pd.concat(parts, ignore_index=True) if parts else pd.DataFrame()
+    # Categoricals with different categories concat to object; restore them.
+    if not df.empty: df = _compact_dtypes(df.sort_values('due_date', kind='stable', ignore_index=True))
+    return df
+
+def _partition_key(assignee):
+    return assignee if isinstance(assignee, str) and assignee else ""
+
+def _split_by_assignee(df):
+    if df.empty: return {}
+    keys = df['assigned_to'].astype(object).map(_partition_key)
+    return {key: part.reset_index(drop=True) for key, part in df.groupby(keys, sort=False)}
+
+class SharedTaskStore:
+    """Task list frames shared by every session, one partition per assignee.
+
+    A member's view only loads their own partition; "All Users" loads them all.
+    One delta sync per TASK_STORE_SYNC_INTERVAL serves every session, and writes
+    patch just the partitions the written rows left or landed in. Frames are
+    replaced, never mutated, so callers can hold on to them without copying.
+    """
+
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.partitions = {}        # assigned_to ("" = unassigned) -> task frame
+        self.index = {}             # task id -> (partition key, updated_at) of every held row
+        self.all_loaded = False
+        self.cursor = None
+        self.read_at = None         # wall time the last load/delta read started
+        self.synced_at = 0.0
+        self.bucket_day = date.today()
+        self.version = 0
+        self._all_frame = (None, None)  # (version, concatenated frame)
+        self._derived = {}              # name -> (version, value), see derive()
+
+    def _has(self, target_email):
+        return self.all_loaded or (target_email is not None and target_email in self.partitions)
+
+    def _load(self, target_email):
+        started = time.time()
+        self._install(target_email, _prepare_task_frame(_fetch_all_tasks(target_email)), started)
+
+    def _install(self, target_email, df, started):
+        if target_email is None:
+            self.partitions, self.all_loaded, self.index = _split_by_assignee(df), True, {}
+            for key, part in self.partitions.items(): self._index_frame(key, part)
+        else:
+            self.partitions[target_email] = df
+            self._index_frame(target_email, df)
+        # Only the first load sets the cursor: moving it forward here would skip
+        # changes to partitions that were loaded earlier.
+        if self.cursor is None: self.cursor, self.read_at = _snapshot_cursor(df), started
+        self.version += 1
+
+    def _index_frame(self, key, df):
+        if df.empty: return
+        self.index.update(zip(df['id'].tolist(), zip([key] * len(df), df[TASK_CURSOR_COL].tolist())))
+
+    def _reload(self):
+        # Everything is fetched before anything is replaced: if the backend
+        # fails partway, the last good frames stay and read() keeps serving them.
+        loaded = None if self.all_loaded else list(self.partitions)
+        started = time.time()
+        frames = {t: _prepare_task_frame(_fetch_all_tasks(t)) for t in ([None] if loaded is None else loaded)}
+        self.partitions, self.index, self.all_loaded, self.cursor, self.read_at = {}, {}, False, None, None
+        for target_email, df in frames.items(): self._install(target_email, df, started)
+
+    def _held_versions(self, ids):
+        return {i: self.index[i][1] for i in ids if i in self.index}
+
+    def _apply(self, rows):
+        ids = {r['id'] for r in rows}
+        # Tasks closed before the window are removed like deletes, not re-added.
+        cutoff = completed_cutoff()
+        rows = [r for r in rows if in_completed_window(r, cutoff)]
+        # Partitions the rows leave or land in; rows for partitions nobody has
+        # loaded yet are dropped and picked up when one is.
+        touched = {self.index[i][0] for i in ids if i in self.index}
+        touched |= {key for key in map(_partition_key, (r.get('assigned_to') for r in rows))
+                    if key in self.partitions or self.all_loaded}
+        if not touched: return
+        base = [part[~part['id'].isin(ids)] for part in (self.partitions.get(key, pd.DataFrame()) for key in touched)
+                if not part.empty]
+        keep = [r for r in rows if _partition_key(r.get('assigned_to')) in touched]
+        # One merge over the touched partitions, then split them back out.
+        merged = _split_by_assignee(_merge_rows(pd.concat(base, ignore_index=True) if base else pd.DataFrame(), keep))
+        for key in touched: self.partitions[key] = merged.get(key, pd.DataFrame())
+        for i in ids: self.index.pop(i, None)
+        self.index.update((r['id'], (_partition_key(r.get('assigned_to')), r.get(TASK_CURSOR_COL))) for r in keep)
+        self.version += 1
+
+    def _sync(self):
+        if self.cursor is None: return self._reload()
+        # updated_at is the writing transaction's start time, so a write can
+        # commit after a read has already seen a later stamp. Re-read an overlap
+        # before the cursor; rows held at the same version are skipped below.
+        # Rows stamped over an overlap before the previous read had committed
+        # by then, so a quiet store stops re-reading its last batch. The overlap
+        # also covers app/database clock skew.
+        overlap = pd.Timedelta(seconds=TASK_CURSOR_OVERLAP_S)
+        since = _stamp_ts(self.cursor) - overlap
+        if self.read_at is not None: since = max(since, _stamp_ts(self.read_at) - overlap)
+        started = time.time()
+        changed = _fetch_changed_tasks(since.isoformat())
+        self.read_at = started
+        if changed:
+            # Skip rows we already hold at the same version (e.g. our own writes).
+            known = self._held_versions([r['id'] for r in changed])
+            fresh = [r for r in changed if known.get(r['id']) != r.get(TASK_CURSOR_COL)]
+            if fresh: self._apply(fresh)
+            self.cursor = max(filter(None, [self.cursor] + [r.get(TASK_CURSOR_COL) for r in changed]), default=None)
+
+        # Deletes never show up in a delta, so compare counts and only pull the id
+        # list when they disagree.
+        assignees = None if self.all_loaded else list(self.partitions)
+        if _count_tasks(assignees) != len(self.index):
+            live_ids = _fetch_task_ids(assignees)
+            gone = set(self.index) - live_ids
+            for key in {self.index.pop(i)[0] for i in gone}:
+                part = self.partitions[key]
+                self.partitions[key] = part[~part['id'].isin(gone)].reset_index(drop=True)
+            self.version += 1
+            if len(live_ids) != len(self.index):
+                # Rows we never saw (e.g. older than the cursor); start over.
+                self._reload()
+
+    def _refresh_buckets(self):
+        # Today/Tomorrow/Overdue shift at midnight.
+        if self.bucket_day == date.today(): return
+        self.partitions = {key: _with_date_bucket(part.copy()) if not part.empty else part
+                           for key, part in self.partitions.items()}
+        self.bucket_day = date.today()
+        self.version += 1
+
+    def read(self, target_email=None, sync=True):
+        with self.lock:
+            # Held across the fetch, so sessions arriving mid-sync wait for it
+            # and share its result instead of issuing their own.
+            try:
+                if not self._has(target_email):
+                    self._load(target_email)
+                    self.synced_at = self.synced_at or time.time()
+                elif sync and time.time() - self.synced_at >= TASK_STORE_SYNC_INTERVAL:
+                    self._sync()
+                    self.synced_at = time.time()
+            except BackendUnavailable as e:
+                # Backend down: keep serving what we hold (the last good data)
+                # and try again next interval. Nothing held yet: nothing to show.
+                if not self._has(target_email): raise
+                note_backend_error("task list", e, stale=True)
+                self.synced_at = time.time()
+            except Exception as e:
+                print(f"Delta sync failed, reloading: {e}")
+                try: self._reload()
+                except BackendUnavailable as e:
+                    if not self._has(target_email): raise
+                    note_backend_error("task list", e, stale=True)
+                self.synced_at = time.time()
+            self._refresh_buckets()
+            return self._view(target_email)
+
+    def _view(self, target_email):
+        if target_email is not None: return self.partitions.get(target_email, pd.DataFrame())
+        version, frame = self._all_frame
+        if version != self.version:
+            parts = [part for part in self.partitions.values() if not part.empty]
+            frame = pd.concat(parts, ignore_index=True) if parts else pd.DataFrame()
+            if not frame.empty:
+                frame = _compact_dtypes(frame.sort_values('due_date', kind='stable', ignore_index=True))
+            self._all_frame = (self.version, frame)
+        return frame
+
+    def apply_writes(self, rows):
+        with self.lock: self._apply(rows)
+
+    def derive(self, name, fn):
+        # Process-wide cache of fn(All Users frame); recomputed only after a
+        # sync or write has moved the store's version.
+        with self.lock:
+            frame = self.read(None)
+            version, value = self._derived.get(name, (None, None))
+            if version != self.version:
+                value = fn(frame)
+                self._derived[name] = (self.version, value)
+            return value
+
+@st.cache_resource
+def get_task_store():
+    return SharedTaskStore()
+
+def read_tasks(target_email=None):
+    # The rerun right after this session's own write: the store is already patched.
+    return get_task_store().read(target_email, sync=not st.session_state.pop('skip_task_sync', False))
+
+@traced("option lists")
+def build_option_lists(df, master_projs=None):
+    if not df.empty:
         used_coords = df['coordinator'].dropna().unique().tolist()
         used_projs = df['project_ref'].dropna().unique().tolist()
     else:
         used_coords = []
         used_projs = []
 
-    master_projs = get_projects_master()
+    if master_projs is None: master_projs = get_projects_master()
     all_projects = sorted(list(set(master_projs + used_projs + ["General"])))
     base_coords = ["Sales Team", "Client", "Support Team", "Internal", "Management"]
     all_coords = sorted(list(set(base_coords + used_coords)))
+    return all_projects, all_coords
 
+def load_data_efficiently(target_email=None):
+    df = read_tasks(target_email)
+    all_projects, all_coords = build_option_lists(df)
     return df, all_projects, all_coords
 
+# --- DASHBOARD BUCKETS ---
+# "snapshot" mode buckets the session's task frame in pandas. "server" mode asks
+# the database for the counts (sql/002_task_buckets.sql) and only pages through
+# the selected bucket, so the browser never holds the full table.
+DASHBOARD_QUERY_MODE = get_setting("DASHBOARD_QUERY_MODE", "snapshot")
+BUCKET_PAGE_SIZE = 100
+BUCKET_PAGE_TTL = 60  # seconds before loaded pages are refetched from the top
+TASK_BUCKETS = ["Pending", "Today", "Tomorrow", "Overdue", "Completed"]
+
+@traced("bucket labels")
+def bucket_labels(df, today_ts=None):
+    # One vectorized pass instead of re-masking the frame per bucket.
+    today_ts = today_ts if today_ts is not None else pd.Timestamp.now().normalize()
+    done = df['status'] == 'Completed'
+    due = df['due_date']
+    return pd.Series(np.select(
+        [done, due < today_ts, due == today_ts, due == today_ts + pd.Timedelta(days=1)],
+        ["Completed", "Overdue", "Today", "Tomorrow"], default="Later"), index=df.index)
+
+def count_buckets(labels):
+    counts = labels.value_counts()
+    result = {b: int(counts.get(b, 0)) for b in TASK_BUCKETS}
+    result["Pending"] = int(len(labels) - result["Completed"])
+    return result
+
+def filter_bucket(df, labels, bucket):
+    if bucket == "Pending": return df[labels != "Completed"]
+    return df[labels == bucket]
+
+def _count_bucket(target_email, bucket, today):
+    query = _bucket_filter(supabase.table("tasks").select("id", count="exact").limit(1), bucket, today)
+    if target_email: query = query.eq("assigned_to", target_email)
+    return query.execute().count or 0
+
+def get_bucket_counts(target_email=None):
+    today = date.today()
+    try:
+        response = supabase.rpc("task_bucket_counts", {"p_assigned_to": target_email, "p_today": str(today)}).execute()
+        row = response.data[0] if isinstance(response.data, list) else response.data
+        return {b: int(row.get(b.lower()) or 0) for b in TASK_BUCKETS}
+    except BackendUnavailable: raise
+    except Exception as e:
+        # RPC not deployed yet: fall back to one head count per bucket.
+        print(f"task_bucket_counts unavailable: {e}")
+        return {b: _count_bucket(target_email, b, today) for b in TASK_BUCKETS}
+
+def _bucket_filter(query, bucket, today, after=None):
+    # `after` is the (due_date, id) of the last row already shown. Rows are
+    # ordered due_date ASC NULLS FIRST, id ASC; a NULL due date counts as today.
+    today_s, tmrw_s = str(today), str(today + timedelta(days=1))
+    if bucket == "Completed": query = query.eq("status", "Completed")
+    else: query = open_tasks(query)
+
+    if bucket == "Today":
+        if after is None: return query.or_(f"due_date.eq.{today_s},due_date.is.null")
+        if after[0] is None: return query.or_(f"due_date.eq.{today_s},and(due_date.is.null,id.gt.{after[1]})")
+        return query.eq("due_date", today_s).gt("id", after[1])
+
+    if bucket == "Tomorrow": query = query.eq("due_date", tmrw_s)
+    elif bucket == "Overdue": query = query.lt("due_date", today_s)
+    if after is None: return query
+    if after[0] is None:
+        return query.or_(f"due_date.not.is.null,and(due_date.is.null,id.gt.{after[1]})")
+    return query.or_(f"due_date.gt.{after[0]},and(due_date.eq.{after[0]},id.gt.{after[1]})")
+
+def fetch_bucket_page(target_email, bucket, after=None, page_size=BUCKET_PAGE_SIZE):
+    query = supabase.table("tasks").select(TASK_LIST_SELECT)
+    if target_email: query = query.eq("assigned_to", target_email)
+    query = _bucket_filter(query, bucket, date.today(), after)
+    rows = query.order("due_date", desc=False, nullsfirst=True).order("id", desc=False).limit(page_size).execute().data or []
+    next_after = (rows[-1].get('due_date'), rows[-1]['id']) if len(rows) == page_size else None
+    return rows, next_after
+
+def load_bucket_pages(target_email, bucket, load_more=False):
+    # Pages already fetched for this view/bucket stay in the session; "Load more"
+    # continues from the stored keyset cursor.
+    pages = st.session_state.setdefault('bucket_pages', {})
+    key = (target_email, bucket, str(date.today()))
+    state = pages.get(key)
+    if state is not None and time.time() - state["fetched_at"] > BUCKET_PAGE_TTL: state = None
+    if state is None or (load_more and state["after"] is not None):
+        after = state["after"] if state else None
+        rows, next_after = fetch_bucket_page(target_email, bucket, after)
+        state = {"rows": (state["rows"] if state else []) + rows, "after": next_after,
+                 "fetched_at": state["fetched_at"] if state else time.time()}
+        pages[key] = state
+    return _prepare_task_frame(state["rows"]), state["after"] is not None
+
+def invalidate_bucket_pages():
+    st.session_state.pop('bucket_pages', None)
+
+# --- COMPLETED HISTORY ---
+# Completions older than the window, newest first, from live and archived
+# tasks alike; pages are fetched on request and kept in the session.
+COMPLETED_PAGE_SIZE = 100
+ARCHIVE_AFTER_DAYS = int(get_setting("ARCHIVE_AFTER_DAYS", 180))
+HISTORY_COLUMNS = ["id", "assigned_to", "task_desc", "project_ref", "coordinator", "due_date", "completed_at"]
+
+def fetch_completed_history(target_email, before=None, page_size=COMPLETED_PAGE_SIZE):
+    # `before` is the (completed_at, id) of the last row already shown.
+    query = supabase.table("task_history").select(",".join(HISTORY_COLUMNS))
+    if target_email: query = query.eq("assigned_to", target_email)
+    if before is None: query = query.lt("completed_at", completed_cutoff())
+    else: query = query.or_(f"completed_at.lt.{before[0]},and(completed_at.eq.{before[0]},id.lt.{before[1]})")
+    rows = query.order("completed_at", desc=True).order("id", desc=True).limit(page_size).execute().data or []
+    next_before = (rows[-1]['completed_at'], rows[-1]['id']) if len(rows) == page_size else None
+    return rows, next_before
+
+def load_completed_history(target_email, load_more=False):
+    history = st.session_state.setdefault('completed_history', {})
+    key = (target_email, completed_cutoff())
+    state = history.get(key)
+    if load_more and (state is None or state["before"] is not None):
+        rows, before = fetch_completed_history(target_email, state["before"] if state else None)
+        state = {"rows": (state["rows"] if state else []) + rows, "before": before}
+        history[key] = state
+    return state
+
+def archive_completed_tasks(older_than_days=ARCHIVE_AFTER_DAYS):
+    try:
+        moved = supabase.rpc("archive_completed_tasks", {"p_older_than_days": older_than_days}).execute().data
+        return True, f"✅ Archived {moved or 0} tasks completed over {older_than_days} days ago."
+    except Exception as e:
+        return False, f"❌ Archive Error: {str(e)}"
+
+# --- TASK SEARCH ---
+# Ranked full-text search over description, subject, project, coordinator,
+# remarks and points, served by the search_tasks RPC and its GIN index
+# (sql/003_task_search.sql), so it stays fast whatever the list size.
+SEARCH_LIMIT = 50
+
+@traced("task search")
+def search_tasks(query, target_email=None, limit=SEARCH_LIMIT):
+    query = " ".join(query.split())
+    if not query: return pd.DataFrame()
+    params = {"p_query": query, "p_assigned_to": target_email, "p_limit": limit}
+    return _prepare_task_frame(supabase.rpc("search_tasks", params).execute().data or [])
+
+# --- WORKLOAD ANALYTICS ---
+# Open / overdue / due-today / recently done counts per assignee, project and
+# coordinator, plus weekly completions, all from the shared All Users frame.
+# Cached on the task store, so every manager shares one computation per change.
+ANALYTICS_DIMENSIONS = {"assigned_to": "Assignee", "project_ref": "Project", "coordinator": "Coordinator"}
+ANALYTICS_WEEKS = 12
+ANALYTICS_RECENT_DAYS = 7
+
+@traced("workload analytics")
+def compute_workload(df, today_ts=None):
+    today_ts = today_ts or pd.Timestamp.now().normalize()
+    if df.empty:
+        flags = pd.DataFrame(columns=["Open", "Overdue", "Today", "Done 7d"], dtype=int)
+        return {"totals": flags.sum(), "tables": {dim: flags for dim in ANALYTICS_DIMENSIONS}}
+
+    done = df['date_bucket'] == "Completed"
+    completed_at = pd.to_datetime(df.get('completed_at'), errors='coerce', utc=True).dt.tz_localize(None)
+    flags = pd.DataFrame({
+        "Open": ~done,
+        "Overdue": df['date_bucket'] == "Overdue",
+        "Today": df['date_bucket'] == "Today",
+        "Done 7d": done & (completed_at >= today_ts - pd.Timedelta(days=ANALYTICS_RECENT_DAYS)),
+    }).astype(int)
+
+    tables = {}
+    for dim in ANALYTICS_DIMENSIONS:
+        keys = df[dim].astype(object).fillna("Unassigned" if dim == "assigned_to" else "General")
+        table = flags.groupby(keys).sum()
+        table = table[(table["Open"] > 0) | (table["Done 7d"] > 0)]
+        tables[dim] = table.sort_values(["Overdue", "Open"], ascending=False)
+    return {"totals": flags.sum(), "tables": tables}
+
+ANALYTICS_THROUGHPUT_TTL_S = 300
+
+@st.cache_data(ttl=ANALYTICS_THROUGHPUT_TTL_S, max_entries=16)
+def get_completions_per_week(since, store_version=None):
+    # Weekly completions reach back past the store's completed window, so they
+    # are aggregated in the database (live + archived tasks). Keyed by the task
+    # store's version like derive(): a Close, bulk close or synced edit
+    # refetches. Errors propagate so a failed fetch is never cached.
+    rows = supabase.rpc("task_completions_per_week", {"p_since": since}).execute().data or []
+    return {str(r['week']): int(r['completed']) for r in rows}
+
+def fetch_completion_throughput(df, today_ts=None, store_version=None):
+    today_ts = today_ts or pd.Timestamp.now().normalize()
+    weeks = pd.date_range(end=today_ts - pd.Timedelta(days=today_ts.weekday()), periods=ANALYTICS_WEEKS, freq="7D")
+    try:
+        counts = pd.Series(get_completions_per_week(str(weeks[0].date()), store_version), dtype=int)
+        counts.index = pd.to_datetime(counts.index)
+    except Exception as e:
+        # RPC not deployed yet (sql/005) or backend down: count the completions
+        # the store holds, i.e. only the last COMPLETED_WINDOW_DAYS.
+        note_backend_error("rpc.task_completions_per_week", e, stale=False)
+        completed_at = pd.to_datetime(df.get('completed_at', pd.Series(dtype=object)), errors='coerce', utc=True)
+        days = completed_at.dropna().dt.tz_localize(None).dt.normalize()
+        counts = (days - pd.to_timedelta(days.dt.weekday, unit="D")).value_counts()
+    return counts.reindex(weeks, fill_value=0).rename("Completed")
+
+def get_workload_analytics():
+    # The throughput RPC runs outside the store lock: a slow or failing call
+    # must not hold up every other session's task reads.
+    store = get_task_store()
+    workload = store.derive("workload", compute_workload)
+    frame = store.read(None)
+    return {**workload, "throughput": fetch_completion_throughput(frame, store_version=store.version)}
+
+# --- DASHBOARD DATA BUNDLE ---
+# The reads a page needs are independent, so they go out together on a shared
+# pool and the rerun waits for the slowest one instead of their sum. Workers
+# get the script context attached so session_state and st.cache_* still work.
+FETCH_WORKERS = 8
+
+@st.cache_resource
+def get_fetch_pool():
+    return ThreadPoolExecutor(max_workers=FETCH_WORKERS, thread_name_prefix="taskhub-fetch")
+
+def run_concurrently(calls):
+    ctx = get_script_run_ctx()
+    def bind(fn):
+        def run():
+            if ctx: add_script_run_ctx(threading.current_thread(), ctx)
+            return fn()
+        return run
+    futures = {name: get_fetch_pool().submit(bind(fn)) for name, fn in calls.items()}
+    return {name: future.result() for name, future in futures.items()}
+
+@traced("dashboard bundle")
+def fetch_dashboard_bundle(view_email, query_mode=None):
+    query_mode = query_mode or DASHBOARD_QUERY_MODE
+    calls = {"projects": get_projects_master, "users": get_active_users}
+    if query_mode == "server": calls["counts"] = lambda: get_bucket_counts(view_email)
+    else: calls["tasks"] = lambda: read_tasks(view_email)
+    results = run_concurrently(calls)
+
+    df = results.get("tasks", pd.DataFrame())
+    all_projects, all_coords = build_option_lists(df, results["projects"])
+    if "counts" in results:
+        labels, bucket_counts = None, results["counts"]
+    else:
+        labels = df['date_bucket'] if not df.empty else pd.Series(dtype=object)
+        bucket_counts = count_buckets(labels)
+    return {"df": df, "labels": labels, "counts": bucket_counts,
+            "all_projects": all_projects, "all_coords": all_coords, "users": results["users"]}
+
 # --- TASK FUNCTIONS ---
+def apply_task_writes(rows):
+    # Patch the shared store with the rows a write returned instead of refetching;
+    # only the partitions those rows left or landed in change, and the cursor is
+    # left alone so the next sync still sees others' edits.
+    rows = [{k: v for k, v in r.items() if k in TASK_LIST_COLUMNS} for r in rows or []]
+    if not rows: return
+    get_task_store().apply_writes(rows)
+    st.session_state['skip_task_sync'] = True
+    invalidate_bucket_pages()
+
+def queue_toast(message, icon=None):
+    # Shown at the start of the next run, so writes can st.rerun() right away.
+    st.session_state.setdefault('pending_toasts', []).append((message, icon))
+
+def show_queued_toasts():
+    for message, icon in st.session_state.pop('pending_toasts', []):
+        st.toast(message, icon=icon)
+
 def add_task(created_by, assigned_to, task_desc, priority, due_date, project_ref, coordinator, email_subject, points):
     try:
         final_date = str(due_date) if due_date else str(date.today())
@@ -192,7 +1347,8 @@ def add_task(created_by, assigned_to, task_desc, priority, due_date, project_ref
             "project_ref": final_project, "staff_remarks": "", "manager_remarks": "",
             "coordinator": final_coord, "email_subject": email_subject, "points": points
         }
-        supabase.table("tasks").insert(data).execute()
+        response = supabase.table("tasks").insert(data).execute()
+        apply_task_writes(response.data)
         return True
     except Exception as e:
         st.error(f"Add Task Error: {e}")
@@ -205,9 +1361,12 @@ def update_task_status(task_id, new_status, remarks=None):
     try:
         data = {"status": new_status}
         if remarks: data["staff_remarks"] = remarks
-        supabase.table("tasks").update(data).eq("id", task_id).execute()
+        response = supabase.table("tasks").update(data).eq("id", task_id).execute()
+        apply_task_writes(response.data)
         return True
-    except: return False
+    except Exception as e:
+        st.error(f"Status update failed: {e}")
+        return False
 
 def update_task_full(task_id, new_desc, new_date, new_prio, new_remarks, new_assign, new_points, new_subject, new_coord, new_proj, is_manager):
     try:
@@ -218,17 +1377,634 @@ def update_task_full(task_id, new_desc, new_date, new_prio, new_remarks, new_ass
         }
         if is_manager and new_assign:
             data["assigned_to"] = new_assign
-        supabase.table("tasks").update(data).eq("id", task_id).execute()
+        response = supabase.table("tasks").update(data).eq("id", task_id).execute()
+        apply_task_writes(response.data)
         return True
     except Exception as e:
         st.error(f"Update failed: {e}")
         return False
 
+# --- BULK TASK ACTIONS ---
+# One update per chunk of ids (and per distinct due date when shifting)
+# instead of one round-trip and rerun per task.
+BULK_CHUNK_SIZE = 100
+
+def bulk_update_tasks(task_ids, data):
+    task_ids = [int(t) for t in task_ids]
+    rows = []
+    try:
+        for start in range(0, len(task_ids), BULK_CHUNK_SIZE):
+            chunk = task_ids[start:start + BULK_CHUNK_SIZE]
+            rows += supabase.table("tasks").update(data).in_("id", chunk).execute().data or []
+    except Exception as e:
+        # Callers rerun straight away (to show the rows that did change), so
+        # the error goes out with the next run's toasts.
+        queue_toast(f"Bulk update stopped after {len(rows)} tasks: {e}", icon="🚨")
+    apply_task_writes(rows)
+    return len(rows)
+
+def bulk_close_tasks(task_ids, close_note):
+    return bulk_update_tasks(task_ids, {"status": "Completed", "staff_remarks": close_note})
+
+def bulk_reassign_tasks(task_ids, new_assign):
+    return bulk_update_tasks(task_ids, {"assigned_to": new_assign})
+
+def bulk_shift_due_dates(tasks_df, days):
+    # Same shift for every task, but each keeps its own date: group by date.
+    updated = 0
+    for due, group in tasks_df.groupby(tasks_df['due_date'].dt.date):
+        updated += bulk_update_tasks(group['id'].tolist(), {"due_date": str(due + timedelta(days=days))})
+    return updated
+
+# --- BULK TASK IMPORT ---
+# Legacy trackers (.xlsx/.csv) are streamed in chunks, validated column-wise
+# with add_task's defaults and inserted in batches; bad rows are reported with
+# their sheet row number instead of stopping the import.
+IMPORT_READ_CHUNK = 5000
+IMPORT_INSERT_CHUNK = 500
+IMPORT_FIELDS = ["task_desc", "assigned_to", "priority", "due_date", "project_ref", "coordinator",
+                 "email_subject", "points", "status", "staff_remarks", "completed_at"]
+IMPORT_DATE_FIELDS = ["due_date", "completed_at"]
+IMPORT_HEADER_ALIASES = {
+    "task": "task_desc", "description": "task_desc", "task description": "task_desc",
+    "assignee": "assigned_to", "assign to": "assigned_to", "assigned to": "assigned_to",
+    "due": "due_date", "due date": "due_date", "project": "project_ref",
+    "email subject": "email_subject", "detailed points": "points", "details": "points",
+    "remarks": "staff_remarks", "completed": "completed_at", "completed on": "completed_at",
+    "closed on": "completed_at", "completion date": "completed_at",
+}
+IMPORT_PRIORITIES = {"high": "🔥 High", "medium": "⚡ Medium", "low": "🧊 Low"}
+EXCEL_EPOCH = pd.Timestamp("1899-12-30")
+EXCEL_SERIAL_RANGE = (18264, 73051)  # 1950-01-01 .. 2100-01-01; other numbers are rejected
+
+def _parse_import_dates(values):
+    # Returns (dates, given). ISO dates and real date cells first; plain numbers
+    # are Excel serial dates (typed into a cell not formatted as a date);
+    # anything else is read day-first (DD-MM-YYYY).
+    given = values.where(values.astype(str).str.strip() != "")
+    serial = pd.to_numeric(given, errors="coerce")
+    dates = pd.to_datetime(given.mask(serial.notna()), errors="coerce", format="ISO8601")
+    other = dates.isna() & given.notna() & serial.isna()
+    if other.any(): dates = dates.fillna(pd.to_datetime(given[other], errors="coerce", format="mixed", dayfirst=True))
+    in_range = serial.between(*EXCEL_SERIAL_RANGE)
+    return dates.mask(in_range, EXCEL_EPOCH + pd.to_timedelta(serial.where(in_range).floordiv(1), unit="D")), given
+
+def _import_field(header):
+    key = str(header).strip().lower() if header is not None else ""
+    return IMPORT_HEADER_ALIASES.get(key, key.replace(" ", "_"))
+
+def iter_import_chunks(file, filename, chunk_size=IMPORT_READ_CHUNK):
+    # Yields raw frames of at most `chunk_size` rows, never the whole file.
+    if filename.lower().endswith(".csv"):
+        yield from pd.read_csv(file, chunksize=chunk_size, dtype=str, keep_default_na=False)
+        return
+    from openpyxl import load_workbook  # only needed for imports
+    workbook = load_workbook(file, read_only=True, data_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None: return
+        width, batch = len(header), []
+        for row in rows:
+            # Read-only sheets can yield short (or empty) rows; pad to the header.
+            batch.append(row[:width] + (None,) * (width - len(row)))
+            if len(batch) == chunk_size:
+                yield pd.DataFrame(batch, columns=header); batch = []
+        if batch: yield pd.DataFrame(batch, columns=header)
+    finally:
+        workbook.close()
+
+@traced("import validation")
+def normalize_import_chunk(raw, created_by, active_users, first_row=2):
+    # Returns (insert-ready records, their sheet rows, rejects) for one chunk.
+    # `first_row` is the sheet row of raw's first line.
+    raw = raw.rename(columns=_import_field)
+    raw = raw.loc[:, ~raw.columns.duplicated()].reindex(columns=IMPORT_FIELDS)
+    sheet_rows = pd.RangeIndex(first_row, first_row + len(raw))
+    text = raw.drop(columns=IMPORT_DATE_FIELDS).apply(lambda col: col.where(col.notna(), "").astype(str).str.strip())
+    reasons = pd.Series("", index=raw.index)
+
+    due, due_raw = _parse_import_dates(raw['due_date'])
+    done_at, done_raw = _parse_import_dates(raw['completed_at'])
+    blank = (text == "").all(axis=1) & due_raw.isna() & done_raw.isna()  # trailing empty rows are skipped
+    reasons = reasons.mask(text['task_desc'] == "", "missing task description")
+
+    assignee = text['assigned_to'].str.lower()
+    # Deactivated users can't log in and aren't offered in the assignee dropdowns.
+    unknown = (assignee != "") & ~assignee.isin(active_users)
+    reasons = reasons.mask((reasons == "") & unknown, "unknown or inactive assignee " + assignee)
+
+    prio_word = text['priority'].str.lower().str.extract(r"(high|medium|low)", expand=False)
+    reasons = reasons.mask((reasons == "") & (text['priority'] != "") & prio_word.isna(), "unknown priority " + text['priority'])
+
+    reasons = reasons.mask((reasons == "") & due_raw.notna() & due.isna(), "invalid due date " + due_raw.astype(str))
+    reasons = reasons.mask((reasons == "") & done_raw.notna() & done_at.isna(), "invalid completed date " + done_raw.astype(str))
+
+    status = text['status'].str.title().replace("", "Open")
+    reasons = reasons.mask((reasons == "") & ~status.isin(["Open", "Completed"]), "unknown status " + text['status'])
+    # Legacy completions keep their own date (else the due date, at the latest
+    # today) instead of being stamped "now", which would count them as just
+    # finished in the Completed tab and the analytics.
+    today_ts = pd.Timestamp(date.today())
+    done_at = done_at.fillna(due.fillna(today_ts).clip(upper=today_ts)).where(status == "Completed")
+
+    ok = (reasons == "") & ~blank
+    records = pd.DataFrame({
+        "created_by": created_by,
+        "assigned_to": assignee.where(assignee != "", None),
+        "task_desc": text['task_desc'],
+        "status": status,
+        "priority": prio_word.map(IMPORT_PRIORITIES).fillna("⚡ Medium"),
+        "due_date": due.dt.strftime("%Y-%m-%d").fillna(str(date.today())),
+        "project_ref": text['project_ref'].replace("", "General"),
+        "staff_remarks": text['staff_remarks'], "manager_remarks": "",
+        "coordinator": text['coordinator'].replace("", "General"),
+        "email_subject": text['email_subject'], "points": text['points'],
+        "completed_at": done_at.dt.strftime("%Y-%m-%d"),
+    })[ok.to_numpy()]
+    rejected = ~ok & ~blank
+    rejects = pd.DataFrame({"row": sheet_rows[rejected.to_numpy()], "reason": reasons[rejected].to_numpy()})
+    return task_records(records), list(sheet_rows[ok.to_numpy()]), rejects
+
+@traced("task import")
+def import_tasks(file, filename, created_by):
+    active_users = set(get_user_directory()["active"])
+    report = {"inserted": 0, "rejects": []}
+    written, first_row = [], 2
+    for raw in iter_import_chunks(file, filename):
+        records, rows, rejects = normalize_import_chunk(raw, created_by, active_users, first_row)
+        report["rejects"].append(rejects)
+        for start in range(0, len(records), IMPORT_INSERT_CHUNK):
+            try:
+                written += supabase.table("tasks").insert(records[start:start + IMPORT_INSERT_CHUNK]).execute().data or []
+            except Exception as e:
+                # The batch is rejected as a whole; earlier batches stay in.
+                batch_rows = rows[start:start + IMPORT_INSERT_CHUNK]
+                report["rejects"].append(pd.DataFrame({"row": batch_rows, "reason": f"insert failed: {e}"}))
+        first_row += len(raw)
+    apply_task_writes(written)
+    report["inserted"] = len(written)
+    report["rejects"] = pd.concat(report["rejects"], ignore_index=True) if report["rejects"] else pd.DataFrame(columns=["row", "reason"])
+    return report
+
+# --- TASK EXPORT ---
+# Full history exports page through `tasks` by id (keyset, so every page is an
+# index range scan) and write each page straight to a temp file, so the rows
+# are never held as a DataFrame or list. The finished file itself is still
+# read into memory once: st.download_button serves bytes, and Streamlit keeps
+# that copy in its media store for the session. Large exports cost roughly
+# their file size in server memory per download.
+EXPORT_PAGE_SIZE = 1000
+EXPORT_COLUMNS = ["id", "created_at", "created_by", "assigned_to", "task_desc", "status", "priority", "due_date",
+                  "project_ref", "coordinator", "staff_remarks", "manager_remarks", "email_subject", "points",
+                  "completed_at", "updated_at"]
+
+def iter_task_pages(assigned_to=None, project_ref=None, page_size=EXPORT_PAGE_SIZE, table="tasks"):
+    last_id = 0
+    while True:
+        query = supabase.table(table).select(",".join(EXPORT_COLUMNS)).gt("id", last_id).order("id").limit(page_size)
+        if assigned_to: query = query.eq("assigned_to", assigned_to)
+        if project_ref: query = query.eq("project_ref", project_ref)
+        rows = query.execute().data or []
+        if rows: yield rows
+        if len(rows) < page_size: return
+        last_id = rows[-1]['id']
+
+def iter_history_pages(assigned_to=None, project_ref=None):
+    # Live tasks, then archived ones (sql/005_task_archive.sql).
+    for table in ("tasks", "tasks_archive"):
+        yield from iter_task_pages(assigned_to, project_ref, table=table)
+
+def export_tasks(fmt, assigned_to=None, project_ref=None):
+    # Returns the finished .csv/.xlsx bytes. Rows are held one page at a time
+    # while writing; the returned file is held whole (see above).
+    with tempfile.TemporaryFile() as out:
+        if fmt == "csv":
+            text = io.TextIOWrapper(out, encoding="utf-8-sig", newline="")  # BOM so Excel reads UTF-8
+            writer = csv.writer(text)
+            writer.writerow(EXPORT_COLUMNS)
+            for rows in iter_history_pages(assigned_to, project_ref):
+                writer.writerows([row.get(col) for col in EXPORT_COLUMNS] for row in rows)
+            text.flush(); text.detach()
+        else:
+            from openpyxl import Workbook  # only needed for exports/imports
+            workbook = Workbook(write_only=True)
+            sheet = workbook.create_sheet("Tasks")
+            sheet.append(EXPORT_COLUMNS)
+            for rows in iter_history_pages(assigned_to, project_ref):
+                for row in rows: sheet.append([row.get(col) for col in EXPORT_COLUMNS])
+            workbook.save(out)
+        out.seek(0)
+        return out.read()
+
+# --- TASK LIST UI ---
+# The list renders one lightweight summary row per task; the full edit form is
+# only built for the task the user has opened, and only one page at a time.
+TASK_LIST_PAGE_SIZE = 50
+
+def _toggle_open_task(task_id):
+    st.session_state['open_task_id'] = None if st.session_state.get('open_task_id') == task_id else task_id
+
+def _set_flag(key):
+    # Button callback: read (and cleared) by the fragment rerun the click starts.
+    st.session_state[key] = True
+
+def _shift_task_page(delta):
+    st.session_state['task_list_page']['page'] += delta
+
+def current_task_page(view_key, total_rows):
+    pager = st.session_state.get('task_list_page')
+    if not pager or pager['key'] != view_key: pager = {'key': view_key, 'page': 0}
+    last_page = max((total_rows - 1) // TASK_LIST_PAGE_SIZE, 0)
+    pager['page'] = min(max(pager['page'], 0), last_page)
+    st.session_state['task_list_page'] = pager
+    return pager['page'], last_page
+
+def task_summary_title(row, completed_view, is_manager, today_ts):
+    try: d_str = row['due_date'].strftime('%d-%b')
+    except: d_str = "No Date"
+    proj = row.get('project_ref', 'General')
+
+    # Due-date status flags
+    is_today = (row['due_date'] == today_ts)
+    is_overdue = (row['due_date'] < today_ts)
+
+    # Prefix Alert Text to Title for visibility OUTSIDE
+    title_prefix = ""
+    icon = ""
+
+    # Completed view keeps its own neutral success icon
+    if completed_view:
+        icon = "🟢"
+    else:
+        # Overdue: Red icon + red [LATE] label
+        if is_overdue: 
+            icon = "🔴"
+            title_prefix = ":red[**[LATE]**] "
+        # Today: Green lightning + green [NOW] label
+        elif is_today: 
+            icon = "⚡"
+            title_prefix = ":green[**[NOW]**] "
+
+    assign_label = f" ➝ {row['assigned_to'].split('@')[0].title()}" if (is_manager and row['assigned_to']) else ""
+    return f"{icon} {title_prefix}{d_str} | {row['task_desc']} ({proj}){assign_label}", is_today, is_overdue
+
+@perf_fragment("task editor")
+def render_task_editor(row, completed_view, is_manager, all_projects, all_coords, assign_opts, is_today, is_overdue):
+    # VISIBLE ALERT INSIDE
+    if is_overdue and not completed_view:
+        st.markdown('<div class="alert-text-overdue">⚠️ OVERDUE TASK - ACTION REQUIRED</div>', unsafe_allow_html=True)
+    elif is_today and not completed_view:
+        st.markdown('<div class="alert-text-today">⚡ DUE TODAY - PRIORITY</div>', unsafe_allow_html=True)
+
+    # --- PROJECT & COORDINATOR EDIT WIDGETS OUTSIDE FORM (INSTANT TOGGLE) ---
+    curr_proj = row.get('project_ref', 'General')
+    edit_projs = sorted(list(set(all_projects + [curr_proj])))
+    curr_coord = row.get('coordinator', '') if pd.notna(row.get('coordinator')) else "General"
+    edit_coords = sorted(list(set(all_coords + [curr_coord])))
+
+    pc1, pc2, _ = st.columns([3, 3, 3])
+    with pc1:
+        p_inp_col, p_chk_col = st.columns([5, 1])
+        is_new_p = p_chk_col.checkbox("Nw", key=f"np_{row['id']}")
+        if is_new_p:
+            st.text_input("Proj", key=f"tp_{row['id']}", label_visibility="collapsed", value=curr_proj)
+        else:
+            try: px = edit_projs.index(curr_proj)
+            except: px = 0
+            st.selectbox("Proj", edit_projs, index=px, key=f"sp_{row['id']}", label_visibility="collapsed")
+
+    with pc2:
+        c_inp_col, c_chk_col = st.columns([5, 1])
+        is_new_c = c_chk_col.checkbox("Nw", key=f"nc_{row['id']}")
+        if is_new_c:
+            st.text_input("Coord", key=f"tc_{row['id']}", label_visibility="collapsed", value=curr_coord)
+        else:
+            try: cx = edit_coords.index(curr_coord)
+            except: cx = 0
+            st.selectbox("Coord", edit_coords, index=cx, key=f"sc_{row['id']}", label_visibility="collapsed")
+
+    # Capture current values from session_state for use inside the form
+    use_new_proj = st.session_state.get(f"np_{row['id']}", False)
+    use_new_coord = st.session_state.get(f"nc_{row['id']}", False)
+    state_proj_new = st.session_state.get(f"tp_{row['id']}", "").strip()
+    state_proj_sel = st.session_state.get(f"sp_{row['id']}", curr_proj)
+    state_coord_new = st.session_state.get(f"tc_{row['id']}", "").strip()
+    state_coord_sel = st.session_state.get(f"sc_{row['id']}", curr_coord)
+
+    with st.form(key=f"edit_{row['id']}"):
+        # COMPACT ROW 1
+        c1, c2, c3 = st.columns([5, 2, 2])
+        new_desc = c1.text_input("Desc", value=row['task_desc'], label_visibility="collapsed", placeholder="Task Description")
+        prio_idx = ["🔥 High", "⚡ Medium", "🧊 Low"].index(row['priority']) if row['priority'] in ["🔥 High", "⚡ Medium", "🧊 Low"] else 1
+        new_prio = c2.selectbox("Prio", ["🔥 High", "⚡ Medium", "🧊 Low"], index=prio_idx, label_visibility="collapsed")
+        new_date = c3.date_input("Date", value=row['due_date'], label_visibility="collapsed")
+
+        # Assignee
+        c4, c5, c6 = st.columns([3, 3, 3])
+        if is_manager:
+            try: ax = assign_opts.index(row['assigned_to'] if row['assigned_to'] else "Unassigned")
+            except: ax = 0
+            new_assign_sel = c4.selectbox("Assign", assign_opts, index=ax, label_visibility="collapsed")
+            new_assign = new_assign_sel if new_assign_sel != "Unassigned" else None
+        else:
+            new_assign = row['assigned_to']
+            c4.text_input("Assign", value=new_assign, disabled=True, label_visibility="collapsed")
+
+        # COMPACT ROW 3
+        curr_rem = row.get('staff_remarks') if row.get('staff_remarks') else ""
+        new_rem = st.text_input("Remarks", value=curr_rem, placeholder="Updates...", label_visibility="collapsed")
+        curr_pts = row.get('points', '') if pd.notna(row.get('points')) else ""
+        new_points = st.text_area("Details", value=curr_pts, height=68, label_visibility="collapsed", placeholder="Detailed Points...")
+
+        # Resolve final project/coord values from state
+        resolved_proj = state_proj_new if use_new_proj and state_proj_new else state_proj_sel
+        resolved_coord = state_coord_new if use_new_coord and state_coord_new else state_coord_sel
+
+        # ACTIONS
+        b1, b2, b3 = st.columns([1, 2, 1])
+        if b1.form_submit_button("💾 Save"):
+            final_p = resolved_proj if resolved_proj else curr_proj
+            final_c = resolved_coord if resolved_coord else curr_coord
+            if update_task_full(row['id'], new_desc, new_date, new_prio, new_rem, new_assign, new_points, row.get('email_subject'), final_c, final_p, is_manager):
+                queue_toast("Saved!"); st.rerun()
+
+        if not completed_view:
+            close_rem = b2.text_input("Close Rem", placeholder="Closing Note...", label_visibility="collapsed", key=f"crm_{row['id']}")
+            if b3.form_submit_button("✅ Close", type="primary"):
+                if close_rem:
+                    if update_task_status(row['id'], "Completed", close_rem):
+                        queue_toast("Completed!"); st.rerun()
+                else: st.warning("Note required.")
+        else:
+            st.write("") 
+            if b3.form_submit_button("🔄 Reinstate"):
+                if update_task_status(row['id'], "Open", row.get('staff_remarks')):
+                    queue_toast("Restored!"); st.rerun()
+
+def render_task_row(row, completed_view, is_manager, all_projects, all_coords, assign_opts, today_ts):
+    title, is_today, is_overdue = task_summary_title(row, completed_view, is_manager, today_ts)
+    is_open = st.session_state.get('open_task_id') == row['id']
+    c_title, c_btn = st.columns([12, 1])
+    c_title.markdown(title)
+    c_btn.button("✖" if is_open else "✏️", key=f"open_{row['id']}", on_click=_toggle_open_task, args=(row['id'],))
+    if is_open:
+        try: row = {**row, **get_task_details(row['id'], row.get(TASK_CURSOR_COL))}
+        except Exception as e:
+            st.error(f"Could not load task details: {e}")
+            return
+        with st.container(border=True):
+            render_task_editor(row, completed_view, is_manager, all_projects, all_coords, assign_opts, is_today, is_overdue)
+
+def _finish_bulk_action(message):
+    # A fresh table key drops the old selection along with the rows.
+    st.session_state['bulk_table_version'] = st.session_state.get('bulk_table_version', 0) + 1
+    queue_toast(message); st.rerun()
+
+def render_bulk_actions(view_df, completed_view, is_manager, assign_opts, view_email=None, bucket=None):
+    table = view_df[['id', 'due_date', 'task_desc', 'project_ref', 'assigned_to', 'priority']].copy()
+    table['due_date'] = table['due_date'].dt.strftime('%d-%b')
+    table.insert(0, 'select', False)
+    # Editor state is positional, so the key changes with the diary, the bucket
+    # and the row order: a different list starts with nothing ticked instead of
+    # carrying ticks over to whatever rows now sit in those positions.
+    rows_hash = hashlib.md5(view_df['id'].to_numpy(dtype=np.int64).tobytes()).hexdigest()[:12]
+    edited = st.data_editor(table, hide_index=True, use_container_width=True, height=420,
+                            disabled=[c for c in table.columns if c != 'select'],
+                            key=f"bulk_table_{view_email or 'all'}_{bucket}_{st.session_state.get('bulk_table_version', 0)}_{rows_hash}",
+                            column_config={"select": st.column_config.CheckboxColumn("✔", width="small"), "id": None,
+                                           "task_desc": "Task", "project_ref": "Project", "assigned_to": "Assigned",
+                                           "due_date": "Due", "priority": "Prio"})
+    # Resolve ticks to task ids and keep only tasks still in this list.
+    selected = view_df[view_df['id'].isin(edited.loc[edited['select'], 'id'])]
+    st.caption(f"{len(selected)} of {len(view_df)} selected")
+    if selected.empty: return
+
+    b1, b2, b3 = st.columns(3)
+    with b1:
+        if not completed_view:
+            close_note = st.text_input("Closing note", key="bulk_close_note", placeholder="Closing Note...")
+            if st.button("✅ Close selected", type="primary", key="bulk_close_btn"):
+                if close_note:
+                    _finish_bulk_action(f"Closed {bulk_close_tasks(selected['id'], close_note)} tasks")
+                else: st.warning("Note required.")
+    with b2:
+        if is_manager:
+            new_assign_sel = st.selectbox("Reassign to", assign_opts, key="bulk_assign")
+            if st.button("👤 Reassign selected", key="bulk_assign_btn"):
+                new_assign = new_assign_sel if new_assign_sel != "Unassigned" else None
+                _finish_bulk_action(f"Reassigned {bulk_reassign_tasks(selected['id'], new_assign)} tasks")
+    with b3:
+        days = st.number_input("Shift due date (days)", value=1, step=1, key="bulk_shift_days")
+        if st.button("📅 Reschedule selected", key="bulk_shift_btn") and days:
+            _finish_bulk_action(f"Rescheduled {bulk_shift_due_dates(selected, int(days))} tasks")
+
 # --- MAIN APP ---
+@perf_fragment("create task")
+def render_create_task_panel(current_user, all_projects, all_coords, users):
+    # Fragment: the "New" toggles and typing only rerun this panel.
+    with st.expander("➕ Create New Task", expanded=False):
+        d_desc = st.text_input("Task Description", placeholder="What needs to be done?", key="d_desc")
+
+        c2, c3 = st.columns(2)
+        # Dashboard Project - Side by Side
+        with c2:
+            p_inp, p_chk = st.columns([4, 1])
+            with p_chk:
+                is_new_proj_d = st.checkbox("New", key="d_p_chk")
+            with p_inp:
+                if is_new_proj_d: selected_project = st.text_input("Project", key="d_p_txt")
+                else: selected_project = st.selectbox("Project", all_projects, key="d_p_sel")
+
+        # Dashboard Coordinator - Side by Side
+        with c3:
+            c_inp, c_chk = st.columns([4, 1])
+            with c_chk:
+                is_new_coord_d = st.checkbox("New", key="d_c_chk")
+            with c_inp:
+                if is_new_coord_d: final_coordinator = st.text_input("Coordinator", key="d_c_txt")
+                else: final_coordinator = st.selectbox("Coordinator", all_coords, key="d_c_sel")
+
+        c4, c5 = st.columns(2)
+        email_subj = c4.text_input("Email Subject", placeholder="Optional", key="d_sub")
+        points = c5.text_area("Detailed Points", height=1, placeholder="One per line...", key="d_pts")
+
+        c6, c7, c8 = st.columns(3)
+        with c6:
+            assign_opts = ["Unassigned"] + users
+            d_idx = assign_opts.index(current_user) if current_user in assign_opts else 0
+            assign_to = st.selectbox("Assign To", assign_opts, index=d_idx, key="d_ass")
+            final_assign = assign_to if assign_to != "Unassigned" else None
+        with c7: prio = st.selectbox("Priority", ["🔥 High", "⚡ Medium", "🧊 Low"], key="d_pri")
+        with c8: due = st.date_input("Due Date", value=date.today(), key="d_due")
+
+        # Simple Button triggers rerun
+        if st.button("🚀 Add", type="primary", use_container_width=True, key="d_add_btn"):
+            if d_desc:
+                proj_save = selected_project if selected_project else "General"
+                coord_save = final_coordinator if final_coordinator else "General"
+                if add_task(current_user, final_assign, d_desc, prio, due, proj_save, coord_save, email_subj, points):
+                    queue_toast("✅ Added!"); st.rerun()
+            else:
+                st.warning("Desc required.")
+
+@perf_fragment("import")
+def render_import_panel(current_user):
+    with st.expander("📥 Bulk Import (Excel / CSV)", expanded=False):
+        st.caption("Columns: Task Description, Assign To, Priority, Due Date, Project, Coordinator, Email Subject, "
+                   "Detailed Points. Blank project/coordinator → General, blank due date → today.")
+        upload = st.file_uploader("Tracker file", type=["xlsx", "csv"], key="import_file")
+        if upload is not None and st.button("📥 Import", type="primary", key="import_btn"):
+            with st.spinner(f"Importing {upload.name}..."):
+                report = import_tasks(upload, upload.name, current_user)
+            st.session_state['import_report'] = report
+            if report["inserted"]: queue_toast(f"✅ Imported {report['inserted']} tasks"); st.rerun()
+
+        report = st.session_state.get('import_report')
+        if report:
+            rejects = report["rejects"]
+            st.caption(f"Last import: {report['inserted']} tasks added, {len(rejects)} rows rejected.")
+            if not rejects.empty:
+                st.dataframe(rejects, hide_index=True, use_container_width=True, height=200)
+                st.download_button("⬇️ Rejected rows (CSV)", rejects.to_csv(index=False), "import_rejects.csv", key="import_rejects_dl")
+
+@perf_fragment("export")
+def render_export_panel(view_email, all_projects, current_user, is_manager):
+    with st.expander("📤 Export History", expanded=False):
+        # Members can only export their own diary.
+        assigned_to = view_email if is_manager else current_user
+        c1, c2, c3 = st.columns([3, 1, 2])
+        project = c1.selectbox("Project", ["All Projects"] + all_projects, key="export_project")
+        fmt = c2.radio("Format", ["xlsx", "csv"], horizontal=True, key="export_fmt", label_visibility="collapsed")
+        project_ref = None if project == "All Projects" else project
+        who = assigned_to.split('@')[0] if assigned_to else "all"
+        file_name = f"tasks_{who}_{(project_ref or 'all').replace(' ', '_')}_{date.today()}.{fmt}"
+        mime = "text/csv" if fmt == "csv" else "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+        # A callable is only run (off the script thread) when the button is clicked.
+        c3.download_button("⬇️ Download", functools.partial(export_tasks, fmt, assigned_to, project_ref),
+                           file_name=file_name, mime=mime, key="export_dl", use_container_width=True)
+
+def render_analytics_page(workload):
+    st.title("📊 Team Workload")
+    totals = workload["totals"]
+    m1, m2, m3, m4 = st.columns(4)
+    m1.metric("Open", int(totals["Open"]))
+    m2.metric("Overdue", int(totals["Overdue"]))
+    m3.metric("Due Today", int(totals["Today"]))
+    m4.metric(f"Done (last {ANALYTICS_RECENT_DAYS} days)", int(totals["Done 7d"]))
+
+    tabs = st.tabs([f"By {label}" for label in ANALYTICS_DIMENSIONS.values()])
+    for tab, (dim, label) in zip(tabs, ANALYTICS_DIMENSIONS.items()):
+        with tab:
+            table = workload["tables"][dim]
+            if table.empty: st.info("👋 No open tasks.")
+            else: st.dataframe(table.rename_axis(label), use_container_width=True, height=420)
+
+    st.subheader(f"✅ Completed per week (last {ANALYTICS_WEEKS} weeks)")
+    st.bar_chart(workload["throughput"], height=220)
+
+def render_completed_history(view_email):
+    # Read-only: older (possibly archived) completions aren't in the editable list.
+    state = load_completed_history(view_email, st.session_state.pop('history_load_more', False))
+    st.caption(f"Completed tab shows the last {COMPLETED_WINDOW_DAYS} days.")
+    if state and state["rows"]:
+        history = pd.DataFrame(state["rows"], columns=HISTORY_COLUMNS).drop(columns="id")
+        st.dataframe(history, hide_index=True, use_container_width=True, height=300)
+    elif state: st.info("No older completed tasks.")
+    if state is None or state["before"] is not None:
+        label = "🕘 Show older completed tasks" if state is None else "⬇️ Load more history"
+        st.button(label, key="history_more_btn", use_container_width=True, on_click=_set_flag, args=('history_load_more',))
+
+def render_search_results(query, view_email, is_manager, bundle):
+    try: results = search_tasks(query, view_email)
+    except Exception as e:
+        st.error(f"Search failed: {e}")
+        return
+    if results.empty:
+        st.info(f"🔍 No tasks match '{query}'.")
+        return
+    st.caption(f"{len(results)} best matches" if len(results) == SEARCH_LIMIT else f"{len(results)} matches")
+    today_ts = pd.Timestamp.now().normalize()
+    assign_opts = ["Unassigned"] + bundle["users"] if is_manager else []
+    with st.container(height=600):
+        for row in task_records(results):
+            render_task_row(row, row['status'] == "Completed", is_manager, bundle["all_projects"], bundle["all_coords"],
+                            assign_opts, today_ts)
+
+@perf_fragment("task list")
+def render_task_list(bundle, view_email, is_manager):
+    # Fragment: bucket tabs, paging and opening a task only rerun the list.
+    df, labels, bucket_counts = bundle["df"], bundle["labels"], bundle["counts"]
+    all_projects, all_coords = bundle["all_projects"], bundle["all_coords"]
+    query = st.text_input("Search", key="task_search", label_visibility="collapsed",
+                          placeholder="🔍 Search descriptions, remarks, points, subjects, projects, coordinators...")
+    if query.strip():
+        render_search_results(query.strip(), view_email, is_manager, bundle)
+        return
+    if bucket_counts["Pending"] + bucket_counts["Completed"] > 0:
+        today_ts = pd.Timestamp.now().normalize()
+        selected_filter = option_menu(
+            menu_title=None,
+            options=[f"{b} ({bucket_counts[b]})" for b in TASK_BUCKETS],
+            icons=["folder", "lightning", "calendar", "exclamation-triangle", "check-circle"],
+            orientation="horizontal",
+            styles={"container": {"padding": "0!important", "background-color": "#fafafa"}}
+        )
+        selected_bucket = selected_filter.split(" (")[0]
+
+        has_more = False
+        if DASHBOARD_QUERY_MODE == "server":
+            load_more = st.session_state.pop('bucket_load_more', False)
+            final_view_df, has_more = load_bucket_pages(view_email, selected_bucket, load_more)
+        else:
+            final_view_df = filter_bucket(df, labels, selected_bucket)
+
+        with st.expander("🤖 AI Summary", expanded=False):
+            if st.button("Summarize", key="ai_summary_btn"):
+                summary = get_ai_summary(df if DASHBOARD_QUERY_MODE != "server" else final_view_df, stream=True)
+                if isinstance(summary, str): st.markdown(summary)
+                else: st.write_stream(summary)
+
+        st.write("")
+        if final_view_df.empty: st.info(f"✅ No tasks found for '{selected_filter}'.")
+        else:
+            completed_view = selected_bucket == "Completed"
+            assign_opts = ["Unassigned"] + bundle["users"] if is_manager else []
+            if st.toggle("☑️ Bulk actions", key="bulk_mode"):
+                render_bulk_actions(final_view_df, completed_view, is_manager, assign_opts, view_email, selected_bucket)
+            else:
+                page, last_page = current_task_page((view_email, selected_bucket), len(final_view_df))
+                page_start = page * TASK_LIST_PAGE_SIZE
+                page_rows = task_records(final_view_df.iloc[page_start:page_start + TASK_LIST_PAGE_SIZE])
+
+                with st.container(height=600):
+                    for row in page_rows:
+                        render_task_row(row, completed_view, is_manager, all_projects, all_coords, assign_opts, today_ts)
+
+                    if has_more:
+                        st.button("⬇️ Load more", use_container_width=True, key="bucket_more_btn",
+                                  on_click=_set_flag, args=('bucket_load_more',))
+
+                if last_page > 0:
+                    n1, n2, n3 = st.columns([1, 3, 1])
+                    n1.button("◀ Prev", key="task_page_prev", disabled=page == 0, on_click=_shift_task_page, args=(-1,))
+                    n2.caption(f"Showing {page_start + 1}–{page_start + len(page_rows)} of {len(final_view_df)}")
+                    n3.button("Next ▶", key="task_page_next", disabled=page == last_page, on_click=_shift_task_page, args=(1,))
+
+        if selected_bucket == "Completed" and DASHBOARD_QUERY_MODE != "server":
+            render_completed_history(view_email)
+
+    else: st.info("👋 No active tasks found.")
+
 def main():
     # Version banner for quick live verification
-    st.success('RBS TaskHub Version 2.0 Live!', icon='✅')
-    st.balloons()
+    st.success(f'RBS TaskHub Version {APP_VERSION} Live!', icon='✅')
+    if not st.session_state.get('welcomed'):
+        st.balloons(); st.session_state['welcomed'] = True
+    notice_slot = st.empty()  # filled at the end with any backend trouble this run hit
+
+    roadmap_worker = start_roadmap_sync_worker()
+    show_queued_toasts()
 
     if 'logged_in' not in st.session_state: st.session_state['logged_in'] = False
     if 'user_role' not in st.session_state: st.session_state['user_role'] = None
@@ -247,7 +2023,8 @@ def main():
                     if st.button("Login", use_container_width=True):
                         email = email_input.lower().strip()
                         if email.endswith(COMPANY_DOMAIN):
-                            user_record = verify_user_in_db(email)
+                            try: user_record, login_error = verify_user_in_db(email), None
+                            except Exception as e: user_record, login_error = None, e
                             if user_record:
                                 st.session_state['logged_in'] = True
                                 st.session_state['user'] = user_record['email']
@@ -255,6 +2032,7 @@ def main():
                                 st.session_state['user_name'] = user_record['name']
                                 login_placeholder.empty() # Clear UI instantly
                                 st.rerun()
+                            elif login_error: st.error(f"🔌 Couldn't reach the user directory, please try again. ({login_error})")
                             else: st.error("🚫 Access Denied.")
                         else: st.error(f"🚫 Restricted Access. {COMPANY_DOMAIN} only.")
     
@@ -265,6 +2043,7 @@ def main():
         user_name = st.session_state['user_name']
         is_manager = (user_role == 'manager')
         
+        perf_section("render: sidebar")
         with st.sidebar:
             st.markdown(f"### 💼 RBS Workspace")
             role_label = "Manager" if is_manager else "Team Member"
@@ -276,6 +2055,8 @@ def main():
                 # Only show Team Master for managers (Sync Roadmap removed)
                 menu_options.append("Team Master") 
                 menu_icons.append("people-fill")
+                menu_options.append("Analytics")
+                menu_icons.append("bar-chart-line")
 
             nav_mode = option_menu(
                 menu_title=None, options=menu_options, icons=menu_icons, 
@@ -289,8 +2070,10 @@ def main():
             st.divider()
             if st.button("Logout", use_container_width=True):
                 st.session_state['logged_in'] = False; st.rerun()
+            perf_slot = st.empty() if is_manager else None
 
         if nav_mode == "Team Master" and is_manager:
+            perf_section("render: team master")
             st.title("👥 Team Master")
             with st.expander("➕ Add New User", expanded=True):
                 with st.form("add_user", clear_on_submit=True):
@@ -301,12 +2084,24 @@ def main():
                     if st.form_submit_button("Add User", type="primary"):
                         if new_email.endswith("@rbsgo.com") and new_name:
                             success, msg = create_new_user(new_email.lower().strip(), new_name, new_role)
-                            if success: st.toast(msg, icon="✅"); time.sleep(1); st.rerun()
+                            if success: queue_toast(msg, icon="✅"); st.rerun()
                             else: st.error(msg)
                         else: st.warning("Invalid.")
 
+            if roadmap_worker:
+                checked = roadmap_worker.last_checked.strftime('%d-%b %H:%M') if roadmap_worker.last_checked else "never"
+                st.caption(f"🗺️ Roadmap sync (every {roadmap_worker.interval // 60} min, last check {checked}): {roadmap_worker.last_result}")
+
+            if st.button(f"🗄️ Archive tasks completed over {ARCHIVE_AFTER_DAYS} days ago", key="archive_btn"):
+                ok, msg = archive_completed_tasks()
+                if ok: queue_toast(msg); st.rerun()
+                else: st.error(msg)
+
             st.subheader("Current Team List")
-            users = supabase.table("user_master").select("*").order("name").execute().data
+            try: users = list(get_user_directory()["by_email"].values())
+            except Exception as e:
+                st.error(f"Couldn't load the team list: {e}")
+                users = []
             if users:
                 df_users = pd.DataFrame(users)
                 for i, u in df_users.iterrows():
@@ -315,12 +2110,21 @@ def main():
                         c1.write(f"**{u['name']}**"); c2.write(f"`{u['email']}`"); c3.caption(f"_{u['role']}_")
                         btn_label = "🔴 Deactivate" if u['status'] == 'active' else "🟢 Activate"
                         if c4.button(btn_label, key=f"tog_{u['email']}"):
-                            toggle_user_status(u['email'], u['status']); st.rerun()
+                            if toggle_user_status(u['email'], u['status']): st.rerun()
+
+        elif nav_mode == "Analytics" and is_manager:
+            perf_section(None)
+            workload = get_workload_analytics()
+            perf_section("render: analytics")
+            render_analytics_page(workload)
 
         # --- SEPARATE NEW TASK PAGE ---
         elif nav_mode == "New Task":
+            perf_section(None)
+            bundle = fetch_dashboard_bundle(None)
+            all_projects, all_coords = bundle["all_projects"], bundle["all_coords"]
+            perf_section("render: new task")
             st.header("✨ Create New Task")
-            _, all_projects, all_coords = load_data_efficiently(None) 
             
             # REMOVED FORM WRAPPER to allow instant interactivity
             task_desc = st.text_input("Task Description", placeholder="What needs to be done?", key="nt_desc")
@@ -350,8 +2154,7 @@ def main():
 
             c6, c7, c8 = st.columns(3)
             with c6:
-                all_users = get_active_users()
-                assign_options = ["Unassigned"] + all_users
+                assign_options = ["Unassigned"] + bundle["users"]
                 d_idx = assign_options.index(current_user) if current_user in assign_options else 0
                 assign_to = st.selectbox("Assign To", assign_options, index=d_idx, key="nt_ass")
                 final_assign = assign_to if assign_to != "Unassigned" else None
@@ -364,225 +2167,49 @@ def main():
                     proj_save = selected_project if selected_project else "General"
                     coord_save = final_coordinator if final_coordinator else "General"
                     if add_task(current_user, final_assign, task_desc, prio, due, proj_save, coord_save, email_subj, points):
-                        st.toast("✅ Task Added!"); time.sleep(0.1); st.rerun()
+                        queue_toast("✅ Task Added!"); st.rerun()
                 else:
                     st.warning("Description required.")
 
+            render_import_panel(current_user)
+
         # --- DASHBOARD VIEW (MAIN) ---
         elif nav_mode == "Dashboard":
-            view_email = None
+            # The diary selector's value is known before it renders, so every
+            # read for this page can be issued at once.
+            view_target = st.session_state.get("view_target", "All Users") if is_manager else current_user
+            view_email = None if view_target == "All Users" else view_target
+            perf_section(None)
+            bundle = fetch_dashboard_bundle(view_email)
+            perf_section("render: dashboard header")
+            all_projects, all_coords = bundle["all_projects"], bundle["all_coords"]
+
             if is_manager:
                 c_filter, c_title = st.columns([1, 3])
                 with c_filter:
-                    all_users = get_active_users()
-                    view_target = st.selectbox("View Diary For:", ["All Users"] + all_users)
-                    if view_target != "All Users": view_email = view_target
+                    all_users = bundle["users"]
+                    st.selectbox("View Diary For:", ["All Users"] + all_users, key="view_target")
                 with c_title: st.title("📔 Operational Diary")
             else:
                 st.title("📔 My Diary")
-                view_email = current_user
             
-            df, all_projects, all_coords = load_data_efficiently(view_email)
-
             # --- 2. NEW TASK EXPANDER (NO FORM WRAPPER FOR INSTANT TOGGLES) ---
-            with st.expander("➕ Create New Task", expanded=False):
-                d_desc = st.text_input("Task Description", placeholder="What needs to be done?", key="d_desc")
-                
-                c2, c3 = st.columns(2)
-                # Dashboard Project - Side by Side
-                with c2:
-                    p_inp, p_chk = st.columns([4, 1])
-                    with p_chk:
-                        is_new_proj_d = st.checkbox("New", key="d_p_chk")
-                    with p_inp:
-                        if is_new_proj_d: selected_project = st.text_input("Project", key="d_p_txt")
-                        else: selected_project = st.selectbox("Project", all_projects, key="d_p_sel")
-                
-                # Dashboard Coordinator - Side by Side
-                with c3:
-                    c_inp, c_chk = st.columns([4, 1])
-                    with c_chk:
-                        is_new_coord_d = st.checkbox("New", key="d_c_chk")
-                    with c_inp:
-                        if is_new_coord_d: final_coordinator = st.text_input("Coordinator", key="d_c_txt")
-                        else: final_coordinator = st.selectbox("Coordinator", all_coords, key="d_c_sel")
-
-                c4, c5 = st.columns(2)
-                email_subj = c4.text_input("Email Subject", placeholder="Optional", key="d_sub")
-                points = c5.text_area("Detailed Points", height=1, placeholder="One per line...", key="d_pts")
-                
-                c6, c7, c8 = st.columns(3)
-                with c6:
-                    all_users_list = get_active_users()
-                    assign_opts = ["Unassigned"] + all_users_list
-                    d_idx = assign_opts.index(current_user) if current_user in assign_opts else 0
-                    assign_to = st.selectbox("Assign To", assign_opts, index=d_idx, key="d_ass")
-                    final_assign = assign_to if assign_to != "Unassigned" else None
-                with c7: prio = st.selectbox("Priority", ["🔥 High", "⚡ Medium", "🧊 Low"], key="d_pri")
-                with c8: due = st.date_input("Due Date", value=date.today(), key="d_due")
-                
-                # Simple Button triggers rerun
-                if st.button("🚀 Add", type="primary", use_container_width=True, key="d_add_btn"):
-                    if d_desc:
-                        proj_save = selected_project if selected_project else "General"
-                        coord_save = final_coordinator if final_coordinator else "General"
-                        if add_task(current_user, final_assign, d_desc, prio, due, proj_save, coord_save, email_subj, points):
-                            st.toast("✅ Added!"); time.sleep(0.01); st.rerun()
-                    else:
-                        st.warning("Desc required.")
+            perf_section("render: create task")
+            render_create_task_panel(current_user, all_projects, all_coords, bundle["users"])
+            render_export_panel(view_email, all_projects, current_user, is_manager)
 
             # --- 3. TASK LIST RENDER ---
-            if not df.empty:
-                today_ts = pd.Timestamp.now().normalize()
-                active_df = df[df['status'] != 'Completed'].copy()
-                completed_df = df[df['status'] == 'Completed'].copy()
-                
-                c_all, c_done = len(active_df), len(completed_df)
-                c_today = len(active_df[active_df['due_date'] == today_ts])
-                c_tmrw = len(active_df[active_df['due_date'] == today_ts + pd.Timedelta(days=1)])
-                c_over = len(active_df[active_df['due_date'] < today_ts])
-                
-                selected_filter = option_menu(
-                    menu_title=None,
-                    options=[f"Pending ({c_all})", f"Today ({c_today})", f"Tomorrow ({c_tmrw})", f"Overdue ({c_over})", f"Completed ({c_done})"],
-                    icons=["folder", "lightning", "calendar", "exclamation-triangle", "check-circle"],
-                    orientation="horizontal",
-                    styles={"container": {"padding": "0!important", "background-color": "#fafafa"}}
-                )
-                
-                final_view_df = completed_df if "Completed" in selected_filter else \
-                                active_df[active_df['due_date'] == today_ts] if "Today" in selected_filter else \
-                                active_df[active_df['due_date'] == today_ts + pd.Timedelta(days=1)] if "Tomorrow" in selected_filter else \
-                                active_df[active_df['due_date'] < today_ts] if "Overdue" in selected_filter else active_df
-                
-                st.write("")
-                if final_view_df.empty: st.info(f"✅ No tasks found for '{selected_filter}'.")
-                else:
-                    with st.container(height=600):
-                        for index, row in final_view_df.iterrows():
-                            try: d_str = row['due_date'].strftime('%d-%b')
-                            except: d_str = "No Date"
-                            proj = row.get('project_ref', 'General')
-                            
-                            # Due-date status flags
-                            is_today = (row['due_date'] == today_ts)
-                            is_overdue = (row['due_date'] < today_ts)
-                            
-                            # Prefix Alert Text to Title for visibility OUTSIDE
-                            title_prefix = ""
-                            icon = ""
-                            
-                            # Completed view keeps its own neutral success icon
-                            if "Completed" in selected_filter:
-                                icon = "🟢"
-                            else:
-                                # Overdue: Red icon + red [LATE] label
-                                if is_overdue: 
-                                    icon = "🔴"
-                                    title_prefix = ":red[**[LATE]**] "
-                                # Today: Green lightning + green [NOW] label
-                                elif is_today: 
-                                    icon = "⚡"
-                                    title_prefix = ":green[**[NOW]**] "
-
-                            assign_label = f" ➝ {row['assigned_to'].split('@')[0].title()}" if (is_manager and row['assigned_to']) else ""
-                            expander_title = f"{icon} {title_prefix}{d_str} | {row['task_desc']} ({proj}){assign_label}"
-                            
-                            with st.expander(expander_title):
-                                # VISIBLE ALERT INSIDE
-                                if is_overdue and "Completed" not in selected_filter:
-                                    st.markdown('<div class="alert-text-overdue">⚠️ OVERDUE TASK - ACTION REQUIRED</div>', unsafe_allow_html=True)
-                                elif is_today and "Completed" not in selected_filter:
-                                    st.markdown('<div class="alert-text-today">⚡ DUE TODAY - PRIORITY</div>', unsafe_allow_html=True)
-
-                                # --- PROJECT & COORDINATOR EDIT WIDGETS OUTSIDE FORM (INSTANT TOGGLE) ---
-                                curr_proj = row.get('project_ref', 'General')
-                                edit_projs = sorted(list(set(all_projects + [curr_proj])))
-                                curr_coord = row.get('coordinator', '') if pd.notna(row.get('coordinator')) else "General"
-                                edit_coords = sorted(list(set(all_coords + [curr_coord])))
-
-                                pc1, pc2, _ = st.columns([3, 3, 3])
-                                with pc1:
-                                    p_inp_col, p_chk_col = st.columns([5, 1])
-                                    is_new_p = p_chk_col.checkbox("Nw", key=f"np_{row['id']}")
-                                    if is_new_p:
-                                        st.text_input("Proj", key=f"tp_{row['id']}", label_visibility="collapsed", value=curr_proj)
-                                    else:
-                                        try: px = edit_projs.index(curr_proj)
-                                        except: px = 0
-                                        st.selectbox("Proj", edit_projs, index=px, key=f"sp_{row['id']}", label_visibility="collapsed")
-
-                                with pc2:
-                                    c_inp_col, c_chk_col = st.columns([5, 1])
-                                    is_new_c = c_chk_col.checkbox("Nw", key=f"nc_{row['id']}")
-                                    if is_new_c:
-                                        st.text_input("Coord", key=f"tc_{row['id']}", label_visibility="collapsed", value=curr_coord)
-                                    else:
-                                        try: cx = edit_coords.index(curr_coord)
-                                        except: cx = 0
-                                        st.selectbox("Coord", edit_coords, index=cx, key=f"sc_{row['id']}", label_visibility="collapsed")
-
-                                # Capture current values from session_state for use inside the form
-                                use_new_proj = st.session_state.get(f"np_{row['id']}", False)
-                                use_new_coord = st.session_state.get(f"nc_{row['id']}", False)
-                                state_proj_new = st.session_state.get(f"tp_{row['id']}", "").strip()
-                                state_proj_sel = st.session_state.get(f"sp_{row['id']}", curr_proj)
-                                state_coord_new = st.session_state.get(f"tc_{row['id']}", "").strip()
-                                state_coord_sel = st.session_state.get(f"sc_{row['id']}", curr_coord)
-
-                                with st.form(key=f"edit_{row['id']}"):
-                                    # COMPACT ROW 1
-                                    c1, c2, c3 = st.columns([5, 2, 2])
-                                    new_desc = c1.text_input("Desc", value=row['task_desc'], label_visibility="collapsed", placeholder="Task Description")
-                                    prio_idx = ["🔥 High", "⚡ Medium", "🧊 Low"].index(row['priority']) if row['priority'] in ["🔥 High", "⚡ Medium", "🧊 Low"] else 1
-                                    new_prio = c2.selectbox("Prio", ["🔥 High", "⚡ Medium", "🧊 Low"], index=prio_idx, label_visibility="collapsed")
-                                    new_date = c3.date_input("Date", value=row['due_date'], label_visibility="collapsed")
-
-                                    # Assignee
-                                    c4, c5, c6 = st.columns([3, 3, 3])
-                                    if is_manager:
-                                        all_users_list = get_active_users()
-                                        assign_opts = ["Unassigned"] + all_users_list
-                                        try: ax = assign_opts.index(row['assigned_to'] if row['assigned_to'] else "Unassigned")
-                                        except: ax = 0
-                                        new_assign_sel = c4.selectbox("Assign", assign_opts, index=ax, label_visibility="collapsed")
-                                        new_assign = new_assign_sel if new_assign_sel != "Unassigned" else None
-                                    else:
-                                        new_assign = row['assigned_to']
-                                        c4.text_input("Assign", value=new_assign, disabled=True, label_visibility="collapsed")
-
-                                    # COMPACT ROW 3
-                                    curr_rem = row['staff_remarks'] if row['staff_remarks'] else ""
-                                    new_rem = st.text_input("Remarks", value=curr_rem, placeholder="Updates...", label_visibility="collapsed")
-                                    curr_pts = row.get('points', '') if pd.notna(row.get('points')) else ""
-                                    new_points = st.text_area("Details", value=curr_pts, height=68, label_visibility="collapsed", placeholder="Detailed Points...")
-
-                                    # Resolve final project/coord values from state
-                                    resolved_proj = state_proj_new if use_new_proj and state_proj_new else state_proj_sel
-                                    resolved_coord = state_coord_new if use_new_coord and state_coord_new else state_coord_sel
-
-                                    # ACTIONS
-                                    b1, b2, b3 = st.columns([1, 2, 1])
-                                    if b1.form_submit_button("💾 Save"):
-                                        final_p = resolved_proj if resolved_proj else curr_proj
-                                        final_c = resolved_coord if resolved_coord else curr_coord
-                                        if update_task_full(row['id'], new_desc, new_date, new_prio, new_rem, new_assign, new_points, row['email_subject'], final_c, final_p, is_manager):
-                                            st.toast("Saved!"); time.sleep(0.01); st.rerun()
-
-                                    if "Completed" not in selected_filter:
-                                        close_rem = b2.text_input("Close Rem", placeholder="Closing Note...", label_visibility="collapsed", key=f"crm_{row['id']}")
-                                        if b3.form_submit_button("✅ Close", type="primary"):
-                                            if close_rem:
-                                                update_task_status(row['id'], "Completed", close_rem)
-                                                st.toast("Completed!"); time.sleep(0.1); st.rerun()
-                                            else: st.warning("Note required.")
-                                    else:
-                                        st.write("") 
-                                        if b3.form_submit_button("🔄 Reinstate"):
-                                            update_task_status(row['id'], "Open", row['staff_remarks'])
-                                            st.toast("Restored!"); time.sleep(0.1); st.rerun()
-
-            else: st.info("👋 No active tasks found.")
+            perf_section("render: task list")
+            render_task_list(bundle, view_email, is_manager)
+
+        if perf_slot is not None: render_perf_panel(perf_slot)
+
+    render_backend_notices(notice_slot)
 
 if __name__ == "__main__":
-    main()
+    begin_perf_run(_script_started)
+    try: main()
+    except BackendUnavailable as e:
+        # Only reached when there is no earlier copy of the data to show.
+        st.error(f"🔌 The database is unreachable right now; please refresh in a minute. ({e})")
+    finally: finish_perf_run()
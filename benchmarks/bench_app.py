@@ -0,0 +1,214 @@
+# RBS TaskHub - offline benchmarks for the app's data paths
+# Runs app.py against the SQLite stand-in (local_backend.py) seeded with
+# synthetic data and prints one timing line per scenario and size.
+#
+#   python benchmarks/bench_app.py                 # 1k / 10k / 100k tasks
+#   python benchmarks/bench_app.py --sizes 1000 --repeat 5
+#   python benchmarks/bench_app.py --sizes 20000 --assignees 500 --skip-dashboard
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP_PATH = os.path.join(ROOT, "app.py")
+sys.path.insert(0, ROOT)
+
+# Must be set before app is imported: it picks its backend at import time.
+os.environ.setdefault("TASKHUB_BACKEND", "local")
+os.environ.setdefault("TASKHUB_LOCAL_DB", ":memory:")
+os.environ.setdefault("ROADMAP_SYNC_INTERVAL", "0")
+# Sync on every read so the delta scenarios measure the fetch, not the store.
+os.environ.setdefault("TASK_STORE_SYNC_INTERVAL", "0")
+
+import pandas as pd  # noqa: E402
+import streamlit as st  # noqa: E402
+import streamlit.logger  # noqa: E402
+from local_backend import LocalBackend  # noqa: E402
+
+# Bare mode logs a "missing ScriptRunContext" warning for every st.* call.
+streamlit.logger.set_log_level("error")
+
+USERS = [f"user{i:03d}@rbsgo.com" for i in range(40)]
+MANAGER = "manager@rbsgo.com"
+PROJECTS = [f"Interface {i:03d}" for i in range(300)]
+COORDS = ["Sales Team", "Client", "Support Team", "Internal", "Management"]
+PRIORITIES = ["🔥 High", "⚡ Medium", "🧊 Low"]
+
+
+def seed_backend(backend, n_tasks, seed=42):
+    rng = random.Random(seed)
+    conn = backend.conn
+    conn.executemany(
+        "insert into user_master (email, name, role, status) values (?, ?, ?, 'active')",
+        [(MANAGER, "Manager", "manager")] + [(u, u.split("@")[0].title(), "member") for u in USERS])
+    conn.executemany("insert into projects (name, status, description, vendor) values (?, 'Live', '', '')",
+                     [(p,) for p in PROJECTS])
+    today = date.today()
+    stamp = "2024-01-01T00:00:00+00:00"
+    rows = []
+    for i in range(n_tasks):
+        due = today + timedelta(days=rng.randint(-30, 30))
+        completed = rng.random() < 0.4
+        completed_at = (today - timedelta(days=rng.randint(0, 90))).isoformat() if completed else None
+        rows.append((stamp, stamp, MANAGER, rng.choice(USERS), f"Task {i} " + "lorem ipsum " * rng.randint(1, 6),
+                     "Completed" if completed else "Open", rng.choice(PRIORITIES), due.isoformat(),
+                     rng.choice(PROJECTS), "staff note " * rng.randint(0, 20), "", rng.choice(COORDS),
+                     f"RE: ticket {i}", "\n".join(f"- point {j}" for j in range(rng.randint(0, 8))), completed_at))
+    conn.executemany(
+        "insert into tasks (created_at, updated_at, created_by, assigned_to, task_desc, status, priority, due_date,"
+        " project_ref, staff_remarks, manager_remarks, coordinator, email_subject, points, completed_at)"
+        " values (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+    conn.commit()
+
+
+def roadmap_sheet(n_rows, revision=0):
+    return pd.DataFrame({
+        "Interface Name": [f"Interface {i:03d}" for i in range(n_rows)],
+        "Status": ["Live" if (i + revision) % 7 else "Blocked" for i in range(n_rows)],
+        "Particulars": [f"Roadmap item {i}" for i in range(n_rows)],
+        "Vendor": [f"Vendor {i % 12}" for i in range(n_rows)],
+    })
+
+
+def timed(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples)
+
+
+def reset_session():
+    for key in list(st.session_state.keys()): del st.session_state[key]
+
+
+def bench_data_paths(app, n_tasks, repeat):
+    backend = LocalBackend(":memory:")
+    seed_backend(backend, n_tasks)
+    app.set_backend(backend)
+    st.cache_data.clear()
+    results = {}
+
+    def cold_load():
+        reset_session()
+        app.get_task_store.clear()
+        app.load_data_efficiently(None)
+    results["load_data_efficiently (cold)"] = timed(cold_load, repeat)
+
+    app.load_data_efficiently(None)
+    results["load_data_efficiently (no changes)"] = timed(lambda: app.load_data_efficiently(None), repeat)
+
+    # Another session inside the shared store's sync interval: no fetch at all.
+    interval, app.TASK_STORE_SYNC_INTERVAL = app.TASK_STORE_SYNC_INTERVAL, 3600
+    def shared_load():
+        reset_session()
+        app.load_data_efficiently(None)
+    results["load_data_efficiently (shared store)"] = timed(shared_load, repeat)
+    app.TASK_STORE_SYNC_INTERVAL = interval
+
+    def delta_load():
+        ids = [r["id"] for r in backend.table("tasks").select("id").limit(max(n_tasks // 100, 1)).execute().data]
+        backend.table("tasks").update({"staff_remarks": f"touched {time.time()}"}).in_("id", ids).execute()
+        app.load_data_efficiently(None)
+    results["load_data_efficiently (1% changed)"] = timed(delta_load, repeat)
+
+    # Straight after a write every sync re-reads that batch (the cursor
+    # overlap) and has to find it already held.
+    store = app.get_task_store()
+    results["store sync (no new writes)"] = timed(lambda: store.read(None), repeat)
+    def one_row_sync():
+        backend.table("tasks").update({"staff_remarks": f"touched {time.time()}"}).eq("id", 1).execute()
+        store.read(None)
+    results["store sync (1 row changed)"] = timed(one_row_sync, repeat)
+
+    df = app.load_data_efficiently(None)[0]
+    def bucket_pass():
+        labels = app.bucket_labels(df)
+        app.count_buckets(labels)
+        for bucket in app.TASK_BUCKETS: app.filter_bucket(df, labels, bucket)
+    results["bucket filtering"] = timed(bucket_pass, repeat)
+
+    results["get_bucket_counts (server)"] = timed(lambda: app.get_bucket_counts(None), repeat)
+    results["fetch_bucket_page (server)"] = timed(lambda: app.fetch_bucket_page(None, "Overdue"), repeat)
+    results["search_tasks (selective)"] = timed(lambda: app.search_tasks(f"task {n_tasks // 2}"), repeat)
+    app.get_task_store().read(None)
+    results["workload analytics (compute)"] = timed(lambda: app.compute_workload(app.get_task_store().read(None)), repeat)
+    results["workload analytics (cached)"] = timed(app.get_workload_analytics, repeat)
+    results["search_tasks (common word)"] = timed(lambda: app.search_tasks("lorem"), repeat)
+
+    import digest
+    directory = app.get_user_directory()
+    users = {email: directory["by_email"][email] for email in directory["active"]}
+    results["daily digest (fetch + build)"] = timed(
+        lambda: digest.build_digests(digest.fetch_due_tasks(date.today()), users, date.today()), repeat)
+
+    sheet = roadmap_sheet(len(PROJECTS) * 2)
+    results["sync_projects (first run)"] = timed(lambda: app.sync_projects(sheet), 1)
+    results["sync_projects (unchanged)"] = timed(lambda: app.sync_projects(sheet), repeat)
+    return results
+
+
+def bench_dashboard_rerun(n_tasks, repeat):
+    from streamlit.testing.v1 import AppTest
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "bench.db")
+        backend = LocalBackend(db_path)
+        seed_backend(backend, n_tasks)
+        backend.conn.close()
+        previous = os.environ.get("TASKHUB_LOCAL_DB")
+        os.environ["TASKHUB_LOCAL_DB"] = db_path
+        # Resource/data caches are process-wide and would hand the script the
+        # backend and masters from the previous run.
+        st.cache_resource.clear()
+        st.cache_data.clear()
+        try:
+            at = AppTest.from_file(APP_PATH, default_timeout=600)
+            at.session_state["logged_in"] = True
+            at.session_state["user"] = MANAGER
+            at.session_state["user_role"] = "manager"
+            at.session_state["user_name"] = "Manager"
+            start = time.perf_counter()
+            at.run()
+            first = time.perf_counter() - start
+            if at.exception: raise RuntimeError(at.exception[0].message)
+            return {"dashboard rerun (first)": first, "dashboard rerun (warm)": timed(at.run, repeat)}
+        finally:
+            if previous is None: os.environ.pop("TASKHUB_LOCAL_DB", None)
+            else: os.environ["TASKHUB_LOCAL_DB"] = previous
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark RBS TaskHub data paths against the local backend.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000])
+    parser.add_argument("--repeat", type=int, default=3, help="runs per scenario (median is reported)")
+    parser.add_argument("--assignees", type=int, default=len(USERS), help="distinct assignees in the seeded data")
+    parser.add_argument("--skip-dashboard", action="store_true", help="skip the scripted Dashboard rerun")
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args(argv)
+    USERS[:] = [f"user{i:03d}@rbsgo.com" for i in range(args.assignees)]
+
+    import app
+
+    report = {}
+    for n_tasks in args.sizes:
+        results = bench_data_paths(app, n_tasks, args.repeat)
+        if not args.skip_dashboard: results.update(bench_dashboard_rerun(n_tasks, args.repeat))
+        report[n_tasks] = results
+        for name, seconds in results.items():
+            print(f"{n_tasks:>8,} tasks  {name:<40} {seconds * 1000:10.1f} ms")
+        print()
+
+    if args.json:
+        with open(args.json, "w") as fh: json.dump(report, fh, indent=2)
+
+
+if __name__ == "__main__":
+    main()
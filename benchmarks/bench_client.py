@@ -0,0 +1,175 @@
+# RBS TaskHub - backend client benchmark against a local fake PostgREST server
+# Drives app.py's real supabase client (pooled httpx, per-call timeouts,
+# retries, circuit breaker, last-good fallback) at a local HTTP server that
+# can be made slow, flaky or unreachable, and prints latency percentiles and
+# outcomes per scenario:
+#   healthy    - every request answers after a few ms
+#   flaky      - a share of requests get a 503
+#   slow tail  - a share of requests hang well past DB_TIMEOUT_S
+#   outage     - every connection is dropped (breaker opens, last good data served)
+# and checks that a last-good answer never stands in for an RPC with other params.
+#
+#   python benchmarks/bench_client.py --reads 400 --json client.json
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+class FakePostgrest(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), FakeHandler)
+        self.lock = threading.Lock()
+        self.rng = random.Random(7)
+        self.rows = [{"email": f"user{i:03d}@rbsgo.com", "name": f"User {i}", "role": "member", "status": "active"}
+                     for i in range(50)]
+        self.configure()
+
+    def configure(self, latency=0.005, fail_rate=0.0, hang_rate=0.0, hang_s=5.0, down=False):
+        self.latency, self.fail_rate, self.hang_rate, self.hang_s, self.down = latency, fail_rate, hang_rate, hang_s, down
+        self.connections = self.requests = 0
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+
+class FakeHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, so connection reuse shows up in the counts
+    wbufsize = 1 << 16  # headers and body in one write; split writes stall on delayed ACKs
+
+    def setup(self):
+        super().setup()
+        with self.server.lock: self.server.connections += 1
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        self.answer()
+
+    do_HEAD = do_POST = do_PATCH = do_DELETE = do_GET
+
+    def answer(self):
+        srv = self.server
+        length = int(self.headers.get("Content-Length") or 0)
+        if length: self.rfile.read(length)
+        with srv.lock:
+            srv.requests += 1
+            roll = srv.rng.random()
+        if srv.down:
+            self.close_connection = True
+            return  # no response at all: the client sees the connection drop
+        if roll < srv.hang_rate:
+            time.sleep(srv.hang_s)
+        elif roll < srv.hang_rate + srv.fail_rate:
+            return self.send(503, b"Service Unavailable", "text/plain")
+        time.sleep(srv.latency)
+        self.send(200, json.dumps(srv.rows).encode(), "application/json")
+
+    def send(self, status, body, content_type):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if self.command != "HEAD": self.wfile.write(body)
+
+
+def run_reads(app, n_reads, workers):
+    seen, stale, errors, latencies = {}, 0, 0, []
+    lock = threading.Lock()
+
+    def read(_):
+        nonlocal stale, errors
+        start = time.perf_counter()
+        try: response = app.supabase.table("user_master").select("*").eq("status", "active").execute()
+        except app.BackendUnavailable: response = None
+        elapsed = time.perf_counter() - start
+        with lock:
+            latencies.append(elapsed)
+            if response is None: errors += 1
+            elif id(response) in seen: stale += 1  # the same object again: served from the last-good cache
+            else: seen[id(response)] = response  # kept alive so ids are not reused
+
+    with ThreadPoolExecutor(workers) as pool: list(pool.map(read, range(n_reads)))
+    latencies.sort()
+    pct = lambda p: latencies[min(len(latencies) - 1, int(p * len(latencies)))]
+    return {"p50_ms": pct(0.50) * 1000, "p95_ms": pct(0.95) * 1000, "p99_ms": pct(0.99) * 1000,
+            "max_ms": latencies[-1] * 1000, "mean_ms": statistics.mean(latencies) * 1000,
+            "fresh": n_reads - stale - errors, "stale": stale, "errors": errors}
+
+
+def check_param_isolation(app, server):
+    # A last-good answer may only stand in for the same query: an RPC with other
+    # params (another user's search or diary) must fail instead.
+    search = lambda query, who: app.supabase.rpc("search_tasks", {"p_query": query, "p_assigned_to": who,
+                                                                   "p_limit": 50}).execute()
+    app.set_backend(app.supabase.client)
+    server.configure()
+    search("alpha", None)
+    server.configure(down=True)
+    search("alpha", None)  # same params: served from the last-good cache
+    try: search("beta", "user001@rbsgo.com")
+    except app.BackendUnavailable: return "ok"
+    raise AssertionError("search_tasks fallback answered for different params")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the RBS TaskHub backend client against a fake server.")
+    parser.add_argument("--reads", type=int, default=400, help="reads per scenario")
+    parser.add_argument("--workers", type=int, default=8, help="concurrent readers")
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args(argv)
+
+    server = FakePostgrest()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    # Must be set before app is imported: it builds its client at import time.
+    os.environ.update(TASKHUB_BACKEND="supabase", SUPABASE_URL=server.url, SUPABASE_KEY="fake-key",
+                      ROADMAP_SYNC_INTERVAL="0")
+    for name, value in {"DB_TIMEOUT_S": "1", "DB_READ_BUDGET_S": "2.5", "DB_RETRY_BACKOFF_S": "0.05",
+                        "DB_BREAKER_RESET_S": "2"}.items():
+        os.environ.setdefault(name, value)
+    import streamlit.logger
+    streamlit.logger.set_log_level("error")
+    import app
+
+    scenarios = {
+        "healthy": {},
+        "flaky (20% 503)": {"fail_rate": 0.2},
+        "slow tail (3% hang)": {"hang_rate": 0.03},
+        "outage (connections dropped)": {"down": True},
+    }
+    report = {}
+    for name, settings in scenarios.items():
+        app.set_backend(app.supabase.client)  # fresh breaker and last-good cache, same connection pool
+        server.configure()
+        app.supabase.table("user_master").select("*").eq("status", "active").execute()  # warm cache and pool
+        server.configure(**settings)
+        result = run_reads(app, args.reads, args.workers)
+        result.update(requests=server.requests, connections=server.connections)
+        report[name] = result
+        print(f"{name:<30} p50 {result['p50_ms']:7.1f}  p95 {result['p95_ms']:7.1f}  p99 {result['p99_ms']:7.1f}  "
+              f"max {result['max_ms']:7.1f} ms | fresh {result['fresh']:4}  stale {result['stale']:4}  "
+              f"errors {result['errors']:3} | {result['requests']} requests on {result['connections']} new connections")
+
+    report["param isolation"] = check_param_isolation(app, server)
+    print(f"{'param isolation':<30} {report['param isolation']}")
+    server.shutdown()
+    if args.json:
+        with open(args.json, "w") as fh: json.dump(report, fh, indent=2)
+
+
+if __name__ == "__main__":
+    main()
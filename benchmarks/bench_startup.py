@@ -0,0 +1,88 @@
+# RBS TaskHub - cold start benchmark
+# Each sample runs in a fresh interpreter, so nothing is already imported:
+#   import        - `import app` (module load: imports, page config, backend)
+#   first render  - first scripted run of a logged-in manager's Dashboard
+#
+#   python benchmarks/bench_startup.py --repeat 5 --json startup.json
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP_PATH = os.path.join(ROOT, "app.py")
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+
+def child_import():
+    start = time.perf_counter()
+    import app  # noqa: F401
+    return {"import": time.perf_counter() - start}
+
+
+def child_render(n_tasks):
+    from bench_app import MANAGER, seed_backend
+    from local_backend import LocalBackend
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "bench.db")
+        backend = LocalBackend(db_path)
+        seed_backend(backend, n_tasks)
+        backend.conn.close()
+        os.environ["TASKHUB_LOCAL_DB"] = db_path
+
+        start = time.perf_counter()
+        from streamlit.testing.v1 import AppTest
+        at = AppTest.from_file(APP_PATH, default_timeout=600)
+        at.session_state["logged_in"] = True
+        at.session_state["user"] = MANAGER
+        at.session_state["user_role"] = "manager"
+        at.session_state["user_name"] = "Manager"
+        at.run()
+        if at.exception: raise RuntimeError(at.exception[0].message)
+        spans = at.session_state["perf_run"]["spans"]
+        load = next((s["ms"] for s in spans if s["name"] == "script load"), 0) / 1000
+        return {"first render": time.perf_counter() - start, "script load (first run)": load}
+
+
+def run_child(mode, n_tasks):
+    env = dict(os.environ, TASKHUB_BACKEND="local", TASKHUB_LOCAL_DB=":memory:", ROADMAP_SYNC_INTERVAL="0")
+    out = subprocess.run([sys.executable, __file__, "--child", mode, "--tasks", str(n_tasks)],
+                         env=env, cwd=ROOT, capture_output=True, text=True, check=True).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure RBS TaskHub cold start (import and first render).")
+    parser.add_argument("--repeat", type=int, default=3, help="fresh interpreters per scenario (median is reported)")
+    parser.add_argument("--tasks", type=int, default=10_000, help="tasks seeded for the first-render run")
+    parser.add_argument("--json", help="also write the results to this file")
+    parser.add_argument("--child", choices=["import", "render"], help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        import streamlit.logger
+        streamlit.logger.set_log_level("error")
+        result = child_import() if args.child == "import" else child_render(args.tasks)
+        print(json.dumps(result))
+        return
+
+    samples = {}
+    for _ in range(args.repeat):
+        for mode in ("import", "render"):
+            for name, seconds in run_child(mode, args.tasks).items(): samples.setdefault(name, []).append(seconds)
+    report = {name: statistics.median(values) for name, values in samples.items()}
+    for name, seconds in report.items():
+        print(f"{name:<30} {seconds * 1000:10.1f} ms")
+
+    if args.json:
+        with open(args.json, "w") as fh: json.dump(report, fh, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+# RBS TaskHub - daily digest job
+# Builds every active user's overdue / due-today digest without a Streamlit
+# server. One paged pull of the open tasks that are due, bucketed and grouped
+# by assignee in pandas. The result is one Markdown file per user, or one row
+# per user in digest_outbox (sql/006_digest_outbox.sql) for the mailer to pick
+# up. Backend settings come from the environment, same as the app
+# (TASKHUB_BACKEND, SUPABASE_URL / SUPABASE_KEY, TASKHUB_LOCAL_DB, ...).
+#
+#   python digest.py --out digests/              # digests/<email>.md
+#   python digest.py --outbox                    # upsert into digest_outbox
+#   python digest.py --outbox --date 2026-10-19 --include-empty
+import argparse
+import os
+import sys
+import time
+from datetime import date
+
+import numpy as np
+import pandas as pd
+import streamlit.logger
+
+# Bare mode logs a "missing ScriptRunContext" warning for every st.* call.
+streamlit.logger.set_log_level("error")
+os.environ.setdefault("ROADMAP_SYNC_INTERVAL", "0")
+
+import app  # noqa: E402
+
+DIGEST_BUCKETS = ["Overdue", "Today"]
+DIGEST_COLUMNS = ["id", "assigned_to", "task_desc", "status", "priority", "due_date", "project_ref", "coordinator"]
+
+
+def fetch_due_tasks(today, page_size=app.EXPORT_PAGE_SIZE):
+    # Open tasks due today or earlier, for every assignee, keyset-paged by id.
+    # A missing due date counts as today and a missing status as open, as on the Dashboard.
+    rows, last_id = [], 0
+    while True:
+        query = app.open_tasks(app.supabase.table("tasks").select(",".join(DIGEST_COLUMNS)))
+        query = query.or_(f"due_date.lte.{today},due_date.is.null").gt("id", last_id).order("id").limit(page_size)
+        page = query.execute().data or []
+        rows += page
+        if len(page) < page_size: return rows
+        last_id = page[-1]['id']
+
+
+def build_digests(rows, users, today, include_empty=False):
+    # `users` maps each active user's email to their user_master row. Returns one
+    # row per recipient: name, overdue, due_today, subject and body.
+    today_ts = pd.Timestamp(today)
+    df = pd.DataFrame(rows, columns=DIGEST_COLUMNS)
+    df = df[df['assigned_to'].isin(list(users))].copy()
+    df['due_date'] = pd.to_datetime(df['due_date'], errors='coerce').fillna(today_ts)
+    df['bucket'] = app.bucket_labels(df, today_ts)
+    df = df[df['bucket'].isin(DIGEST_BUCKETS)].sort_values(['assigned_to', 'due_date', 'id'])
+
+    # Every task line is built column-wise, then joined per (user, bucket).
+    late = (today_ts - df['due_date']).dt.days
+    line = ("- " + df['task_desc'].fillna("").astype(str)
+            + " [" + df['project_ref'].fillna("General").astype(str) + " / " + df['coordinator'].fillna("General").astype(str) + "]"
+            + " " + df['priority'].fillna("").astype(str)
+            + pd.Series(np.where(late > 0, " - due " + df['due_date'].dt.strftime("%d %b") + " (" + late.astype(str) + "d late)", ""),
+                        index=df.index, dtype=str))
+    keys = [df['assigned_to'], df['bucket']]
+    sections = line.groupby(keys).agg("\n".join).unstack().reindex(columns=DIGEST_BUCKETS)
+    counts = line.groupby(keys).size().unstack(fill_value=0).reindex(columns=DIGEST_BUCKETS, fill_value=0)
+
+    recipients = pd.Index(sorted(users) if include_empty else counts.index, name="recipient")
+    out = pd.DataFrame(index=recipients)
+    out['name'] = pd.Series([users[email].get('name') or email for email in recipients], index=recipients, dtype=str)
+    out['overdue'] = counts['Overdue'].reindex(recipients, fill_value=0).astype(int)
+    out['due_today'] = counts['Today'].reindex(recipients, fill_value=0).astype(int)
+    overdue = sections['Overdue'].reindex(recipients).fillna("Nothing overdue.").astype(str)
+    due_today = sections['Today'].reindex(recipients).fillna("Nothing due today.").astype(str)
+    out['subject'] = (f"TaskHub digest {today:%d %b %Y}: " + out['overdue'].astype(str) + " overdue, "
+                      + out['due_today'].astype(str) + " due today")
+    out['body'] = ("Hi " + out['name'] + ",\n\n"
+                   + "## Overdue (" + out['overdue'].astype(str) + ")\n" + overdue + "\n\n"
+                   + "## Due today (" + out['due_today'].astype(str) + ")\n" + due_today + "\n")
+    return out
+
+
+def write_files(digests, out_dir):
+    os.makedirs(out_dir, exist_ok=True)
+    for email, body in digests['body'].items():
+        with open(os.path.join(out_dir, f"{email}.md"), "w", encoding="utf-8") as fh: fh.write(body)
+
+
+def write_outbox(digests, today, chunk_size=app.IMPORT_INSERT_CHUNK):
+    records = [{"recipient": email, "digest_date": str(today), "subject": row.subject, "body": row.body,
+                "overdue": int(row.overdue), "due_today": int(row.due_today)}
+               for email, row in zip(digests.index, digests.itertuples(index=False))]
+    for start in range(0, len(records), chunk_size):
+        app.supabase.table("digest_outbox").upsert(records[start:start + chunk_size],
+                                                   on_conflict="recipient,digest_date").execute()
+
+
+def run(today=None, out_dir=None, outbox=False, include_empty=False):
+    today = today or date.today()
+    directory = app.get_user_directory()  # raises on backend errors, unlike get_active_users()
+    users = {email: directory["by_email"][email] for email in directory["active"]}
+    digests = build_digests(fetch_due_tasks(today), users, today, include_empty)
+    if out_dir: write_files(digests, out_dir)
+    if outbox: write_outbox(digests, today)
+    return digests
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Write each active user's overdue and due-today task digest.")
+    parser.add_argument("--out", help="write one <email>.md per user into this directory")
+    parser.add_argument("--outbox", action="store_true", help="upsert one row per user into digest_outbox")
+    parser.add_argument("--date", type=date.fromisoformat, help="digest date (default: today)")
+    parser.add_argument("--include-empty", action="store_true", help="also write digests with nothing due")
+    args = parser.parse_args(argv)
+    if not args.out and not args.outbox: parser.error("choose --out DIR and/or --outbox")
+
+    start = time.perf_counter()
+    try: digests = run(args.date, args.out, args.outbox, args.include_empty)
+    except Exception as e:
+        print(f"Digest failed: {e}", file=sys.stderr)
+        return 1
+    print(f"{len(digests)} digests ({digests['overdue'].sum()} overdue, {digests['due_today'].sum()} due today) "
+          f"in {time.perf_counter() - start:.2f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,449 @@
+# RBS TaskHub - local SQLite stand-in for the Supabase client
+# Implements the slice of the supabase-py query builder that app.py uses, on
+# top of sqlite3, so the app and the benchmarks can run fully offline.
+import json
+import re
+import sqlite3
+import threading
+from datetime import datetime, timedelta, timezone
+
+SCHEMA = """
+create table if not exists tasks (
+    id integer primary key autoincrement,
+    created_at text,
+    updated_at text,
+    created_by text,
+    assigned_to text,
+    task_desc text,
+    status text default 'Open',
+    priority text,
+    due_date text,
+    project_ref text,
+    staff_remarks text,
+    manager_remarks text,
+    coordinator text,
+    email_subject text,
+    points text,
+    completed_at text
+);
+create index if not exists tasks_updated_at_idx on tasks (updated_at);
+create index if not exists tasks_assigned_due_idx on tasks (assigned_to, due_date, id);
+
+-- FTS5 stand-in for the search_doc tsvector/GIN index (sql/003_task_search.sql).
+create virtual table if not exists tasks_fts using fts5(
+    task_desc, email_subject, project_ref, coordinator, staff_remarks, points,
+    content='tasks', content_rowid='id'
+);
+create trigger if not exists tasks_fts_insert after insert on tasks begin
+    insert into tasks_fts (rowid, task_desc, email_subject, project_ref, coordinator, staff_remarks, points)
+    values (new.id, new.task_desc, new.email_subject, new.project_ref, new.coordinator, new.staff_remarks, new.points);
+end;
+create trigger if not exists tasks_fts_delete after delete on tasks begin
+    insert into tasks_fts (tasks_fts, rowid, task_desc, email_subject, project_ref, coordinator, staff_remarks, points)
+    values ('delete', old.id, old.task_desc, old.email_subject, old.project_ref, old.coordinator, old.staff_remarks, old.points);
+end;
+create trigger if not exists tasks_fts_update after update on tasks begin
+    insert into tasks_fts (tasks_fts, rowid, task_desc, email_subject, project_ref, coordinator, staff_remarks, points)
+    values ('delete', old.id, old.task_desc, old.email_subject, old.project_ref, old.coordinator, old.staff_remarks, old.points);
+    insert into tasks_fts (rowid, task_desc, email_subject, project_ref, coordinator, staff_remarks, points)
+    values (new.id, new.task_desc, new.email_subject, new.project_ref, new.coordinator, new.staff_remarks, new.points);
+end;
+
+-- Completed history (sql/005_task_archive.sql).
+create table if not exists tasks_archive (
+    id integer primary key,
+    created_at text,
+    updated_at text,
+    created_by text,
+    assigned_to text,
+    task_desc text,
+    status text,
+    priority text,
+    due_date text,
+    project_ref text,
+    staff_remarks text,
+    manager_remarks text,
+    coordinator text,
+    email_subject text,
+    points text,
+    completed_at text,
+    archived_at text
+);
+create index if not exists tasks_archive_completed_idx on tasks_archive (completed_at, id);
+create view if not exists task_history as
+    select id, created_by, assigned_to, task_desc, status, priority, due_date, project_ref, coordinator,
+           completed_at, updated_at
+    from tasks where status = 'Completed'
+    union all
+    select id, created_by, assigned_to, task_desc, status, priority, due_date, project_ref, coordinator,
+           completed_at, updated_at
+    from tasks_archive;
+
+create table if not exists projects (
+    id integer primary key autoincrement,
+    name text unique,
+    status text,
+    description text,
+    vendor text
+);
+
+create table if not exists user_master (
+    id integer primary key autoincrement,
+    email text unique,
+    name text,
+    role text,
+    status text
+);
+
+-- Daily digest outbox (sql/006_digest_outbox.sql).
+create table if not exists digest_outbox (
+    id integer primary key autoincrement,
+    recipient text not null,
+    digest_date text not null,
+    subject text not null,
+    body text not null,
+    overdue integer not null default 0,
+    due_today integer not null default 0,
+    created_at text default current_timestamp,
+    sent_at text,
+    unique (recipient, digest_date)
+);
+"""
+
+# Tables whose rows carry created_at/updated_at stamps.
+STAMPED_TABLES = {"tasks"}
+
+
+def _now():
+    return datetime.now(timezone.utc).isoformat()
+
+
+class APIResponse:
+    def __init__(self, data, count=None):
+        self.data = data
+        self.count = count
+
+
+class LocalBackendError(Exception):
+    pass
+
+
+def _split_top_level(expr):
+    # Split "a.eq.1,and(b.eq.2,c.eq.3)" on commas outside parentheses.
+    parts, depth, buf = [], 0, ""
+    for ch in expr:
+        if ch == "(": depth += 1
+        elif ch == ")": depth -= 1
+        if ch == "," and depth == 0:
+            parts.append(buf); buf = ""
+        else: buf += ch
+    if buf: parts.append(buf)
+    return parts
+
+
+_OPS = {"eq": "=", "neq": "!=", "gt": ">", "gte": ">=", "lt": "<", "lte": "<="}
+
+
+def _quote_cols(cols):
+    return ", ".join(f'"{c}"' for c in cols)
+
+
+def _coerce(value):
+    if isinstance(value, bool): return int(value)
+    if isinstance(value, (dict, list)): return json.dumps(value)
+    return value
+
+
+def _parse_condition(expr):
+    # PostgREST logic-tree syntax used by .or_(): "col.op.value" or "and(...)".
+    m = re.match(r"^(and|or)\((.*)\)$", expr)
+    if m:
+        joiner = " AND " if m.group(1) == "and" else " OR "
+        sqls, params = [], []
+        for part in _split_top_level(m.group(2)):
+            s, p = _parse_condition(part)
+            sqls.append(s); params += p
+        return "(" + joiner.join(sqls) + ")", params
+    col, op, value = expr.split(".", 2)
+    if op == "not":
+        sql, params = _parse_condition(f"{col}.{value}")
+        return f"NOT ({sql})", params
+    if op in _OPS:
+        return f'"{col}" {_OPS[op]} ?', [value]
+    if op == "is":
+        return f'"{col}" IS NULL' if value == "null" else f'"{col}" IS NOT NULL', []
+    if op == "in":
+        values = [v.strip().strip('"') for v in value.strip("()").split(",") if v.strip()]
+        return f'"{col}" IN ({",".join("?" * len(values))})', values
+    if op == "ilike":
+        return f'"{col}" LIKE ?', [value.replace("*", "%")]
+    raise LocalBackendError(f"Unsupported filter operator: {op}")
+
+
+class LocalQuery:
+    def __init__(self, backend, table):
+        self._backend = backend
+        self._table = table
+        self._action = "select"
+        self._columns = "*"
+        self._count = None
+        self._payload = None
+        self._on_conflict = None
+        self._where = []
+        self._params = []
+        self._order = []
+        self._limit = None
+        self._offset = None
+
+    # --- actions ---
+    def select(self, columns="*", count=None, **_):
+        self._action, self._columns, self._count = "select", columns, count
+        return self
+
+    def insert(self, data, **_):
+        self._action, self._payload = "insert", data
+        return self
+
+    def upsert(self, data, on_conflict=None, **_):
+        self._action, self._payload, self._on_conflict = "upsert", data, on_conflict
+        return self
+
+    def update(self, data, **_):
+        self._action, self._payload = "update", data
+        return self
+
+    def delete(self, **_):
+        self._action = "delete"
+        return self
+
+    # --- filters ---
+    def _add(self, sql, params=()):
+        self._where.append(sql)
+        self._params.extend(params)
+        return self
+
+    def eq(self, col, value): return self._add(f'"{col}" = ?', [_coerce(value)])
+    def neq(self, col, value): return self._add(f'"{col}" != ?', [_coerce(value)])
+    def gt(self, col, value): return self._add(f'"{col}" > ?', [_coerce(value)])
+    def gte(self, col, value): return self._add(f'"{col}" >= ?', [_coerce(value)])
+    def lt(self, col, value): return self._add(f'"{col}" < ?', [_coerce(value)])
+    def lte(self, col, value): return self._add(f'"{col}" <= ?', [_coerce(value)])
+
+    def in_(self, col, values):
+        values = [_coerce(v) for v in values]
+        if not values: return self._add("0 = 1")
+        return self._add(f'"{col}" IN ({",".join("?" * len(values))})', values)
+
+    def is_(self, col, value):
+        if value in (None, "null"): return self._add(f'"{col}" IS NULL')
+        return self._add(f'"{col}" IS ?', [_coerce(value)])
+
+    def ilike(self, col, pattern):
+        return self._add(f'"{col}" LIKE ?', [pattern.replace("*", "%")])
+
+    def or_(self, filters, **_):
+        sql, params = _parse_condition(f"or({filters})")
+        return self._add(sql, params)
+
+    # --- modifiers ---
+    def order(self, col, desc=False, nullsfirst=None, **_):
+        nulls = "" if nullsfirst is None else (" NULLS FIRST" if nullsfirst else " NULLS LAST")
+        self._order.append(f'"{col}" {"DESC" if desc else "ASC"}{nulls}')
+        return self
+
+    def limit(self, n, **_):
+        self._limit = n
+        return self
+
+    def range(self, start, end, **_):
+        self._offset, self._limit = start, end - start + 1
+        return self
+
+    # --- execution ---
+    def _where_sql(self):
+        return (" WHERE " + " AND ".join(self._where)) if self._where else ""
+
+    def execute(self):
+        with self._backend.lock:
+            return getattr(self, f"_exec_{self._action}")()
+
+    def _exec_select(self):
+        conn = self._backend.conn
+        cols = "*" if self._columns.strip() == "*" else ", ".join(
+            f'"{c.strip()}"' for c in self._columns.split(",") if c.strip())
+        sql = f'SELECT {cols} FROM "{self._table}"' + self._where_sql()
+        if self._order: sql += " ORDER BY " + ", ".join(self._order)
+        if self._limit is not None: sql += f" LIMIT {int(self._limit)}"
+        if self._offset: sql += f" OFFSET {int(self._offset)}"
+        rows = [dict(r) for r in conn.execute(sql, self._params)]
+        count = None
+        if self._count:
+            count = conn.execute(f'SELECT COUNT(*) FROM "{self._table}"' + self._where_sql(), self._params).fetchone()[0]
+        return APIResponse(rows, count)
+
+    def _rows(self):
+        return self._payload if isinstance(self._payload, list) else [self._payload]
+
+    def _stamp(self, row, inserting):
+        if self._table not in STAMPED_TABLES: return row
+        row = dict(row)
+        now = _now()
+        if inserting:
+            row.setdefault("created_at", now)
+            # Like the sql/004 trigger: a completed_at supplied on insert is kept.
+            if row.get("status") == "Completed" and not row.get("completed_at"): row["completed_at"] = now
+        row["updated_at"] = now
+        return row
+
+    def _exec_insert(self):
+        conn = self._backend.conn
+        out = []
+        for row in self._rows():
+            row = self._stamp(row, True)
+            cols = list(row)
+            sql = (f'INSERT INTO "{self._table}" ({_quote_cols(cols)}) '
+                   f'VALUES ({",".join("?" * len(cols))}) RETURNING *')
+            out += [dict(r) for r in conn.execute(sql, [_coerce(row[c]) for c in cols])]
+        conn.commit()
+        return APIResponse(out)
+
+    def _exec_upsert(self):
+        conn = self._backend.conn
+        keys = (self._on_conflict or "id").split(",")  # PostgREST takes "a,b" for a composite key
+        out = []
+        for row in self._rows():
+            row = self._stamp(row, True)
+            cols = list(row)
+            updates = ", ".join(f'"{c}" = excluded."{c}"' for c in cols if c not in keys and c != "created_at")
+            sql = (f'INSERT INTO "{self._table}" ({_quote_cols(cols)}) '
+                   f'VALUES ({",".join("?" * len(cols))}) '
+                   f'ON CONFLICT({_quote_cols(keys)}) DO ' + (f"UPDATE SET {updates}" if updates else "NOTHING") + " RETURNING *")
+            out += [dict(r) for r in conn.execute(sql, [_coerce(row[c]) for c in cols])]
+        conn.commit()
+        return APIResponse(out)
+
+    def _exec_update(self):
+        conn = self._backend.conn
+        row = self._stamp(self._payload, False)
+        sets = ", ".join(f'"{c}" = ?' for c in row)
+        params = [_coerce(v) for v in row.values()]
+        if self._table in STAMPED_TABLES and "status" in row and "completed_at" not in row:
+            # Mirrors the completed_at trigger (sql/004): stamped on the move to
+            # Completed, kept on re-saves, cleared on reinstate. "status" here is
+            # the old value.
+            sets += (', "completed_at" = CASE WHEN ? != \'Completed\' THEN NULL'
+                     ' WHEN "status" = \'Completed\' THEN "completed_at" ELSE ? END')
+            params += [row["status"], row["updated_at"]]
+        sql = f'UPDATE "{self._table}" SET {sets}' + self._where_sql() + " RETURNING *"
+        out = [dict(r) for r in conn.execute(sql, params + self._params)]
+        conn.commit()
+        return APIResponse(out)
+
+    def _exec_delete(self):
+        conn = self._backend.conn
+        sql = f'DELETE FROM "{self._table}"' + self._where_sql() + " RETURNING *"
+        out = [dict(r) for r in conn.execute(sql, self._params)]
+        conn.commit()
+        return APIResponse(out)
+
+
+class LocalRPC:
+    def __init__(self, backend, fn, params):
+        self._backend, self._fn, self._params = backend, fn, params or {}
+
+    def execute(self):
+        with self._backend.lock:
+            return APIResponse(self._fn(self._backend.conn, **self._params))
+
+
+# --- RPCs (mirrors of the functions in sql/) ---
+def rpc_task_bucket_counts(conn, p_assigned_to=None, p_today=None):
+    today = p_today or datetime.now().date().isoformat()
+    sql = """
+        select
+            sum(coalesce(status, '') != 'Completed') as pending,
+            sum(coalesce(status, '') != 'Completed' and coalesce(due_date, :today) = :today) as today,
+            sum(coalesce(status, '') != 'Completed' and due_date = date(:today, '+1 day')) as tomorrow,
+            sum(coalesce(status, '') != 'Completed' and due_date < :today) as overdue,
+            sum(status = 'Completed') as completed
+        from tasks where :who is null or assigned_to = :who
+    """
+    row = conn.execute(sql, {"today": today, "who": p_assigned_to}).fetchone()
+    return [{k: row[k] or 0 for k in row.keys()}]
+
+
+def rpc_search_tasks(conn, p_query, p_assigned_to=None, p_limit=50):
+    # Same semantics as search_tasks(): every word as a prefix, best rank first.
+    # bm25 weights follow the A/B/C tsvector weights; lower bm25 is better.
+    words = re.findall(r"\w+", (p_query or "").lower())
+    if not words: return []
+    sql = """
+        select t.id, t.created_by, t.assigned_to, t.task_desc, t.status, t.priority, t.due_date,
+               t.project_ref, t.coordinator, t.updated_at, -bm25(tasks_fts, 10, 4, 4, 4, 1, 1) as rank
+        from tasks_fts join tasks t on t.id = tasks_fts.rowid
+        where tasks_fts match :query and (:who is null or t.assigned_to = :who)
+        order by rank desc, t.due_date, t.id
+        limit :limit
+    """
+    query = " AND ".join(f'"{w}"*' for w in words)
+    return [dict(row) for row in conn.execute(sql, {"query": query, "who": p_assigned_to, "limit": p_limit})]
+
+
+ARCHIVE_COLUMNS = ("id, created_at, updated_at, created_by, assigned_to, task_desc, status, priority, due_date,"
+                   " project_ref, staff_remarks, manager_remarks, coordinator, email_subject, points, completed_at")
+
+
+def rpc_archive_completed_tasks(conn, p_older_than_days=180):
+    cutoff = (datetime.now(timezone.utc) - timedelta(days=p_older_than_days)).isoformat()
+    where = "where status = 'Completed' and completed_at < ?"
+    conn.execute(f"insert into tasks_archive ({ARCHIVE_COLUMNS}, archived_at) "
+                 f"select {ARCHIVE_COLUMNS}, ? from tasks {where}", (_now(), cutoff))
+    moved = conn.execute(f"delete from tasks {where}", (cutoff,)).rowcount
+    conn.commit()
+    return moved
+
+
+def rpc_task_completions_per_week(conn, p_since):
+    # Weeks start on Monday, like date_trunc('week', ...).
+    sql = """
+        select date(completed_at, '-6 days', 'weekday 1') as week, count(*) as completed
+        from task_history where completed_at >= ?
+        group by 1 order by 1
+    """
+    return [dict(row) for row in conn.execute(sql, (str(p_since),))]
+
+
+RPCS = {
+    "task_bucket_counts": rpc_task_bucket_counts,
+    "search_tasks": rpc_search_tasks,
+    "archive_completed_tasks": rpc_archive_completed_tasks,
+    "task_completions_per_week": rpc_task_completions_per_week,
+}
+
+
+class LocalBackend:
+    """Drop-in for the supabase Client: `.table(...)` and `.rpc(...)` only."""
+
+    def __init__(self, path=":memory:"):
+        self.path = path
+        self.lock = threading.RLock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.executescript(SCHEMA)
+        if "completed_at" not in [r[1] for r in self.conn.execute("pragma table_info(tasks)")]:
+            # A database file from before sql/004_task_completed_at.sql.
+            self.conn.execute("alter table tasks add column completed_at text")
+            self.conn.execute("update tasks set completed_at = updated_at where status = 'Completed'")
+        if self.conn.execute("select count(*) from tasks").fetchone()[0] and \
+                not self.conn.execute("select count(*) from tasks_fts_docsize").fetchone()[0]:
+            # A database file from before the search index existed.
+            self.conn.execute("insert into tasks_fts (tasks_fts) values ('rebuild')")
+            self.conn.commit()
+        self.rpcs = dict(RPCS)
+
+    def table(self, name):
+        return LocalQuery(self, name)
+
+    def rpc(self, name, params=None):
+        if name not in self.rpcs: raise LocalBackendError(f"Unknown RPC: {name}")
+        return LocalRPC(self, self.rpcs[name], params)
@@ -0,0 +1,18 @@
+-- Change cursor for the per-session task snapshot (load_data_efficiently).
+-- Every insert/update bumps updated_at so reruns can fetch only changed rows.
+
+alter table tasks add column if not exists updated_at timestamptz not null default now();
+
+create or replace function set_tasks_updated_at() returns trigger as $$
+begin
+    new.updated_at := now();
+    return new;
+end;
+$$ language plpgsql;
+
+drop trigger if exists tasks_set_updated_at on tasks;
+create trigger tasks_set_updated_at
+    before insert or update on tasks
+    for each row execute function set_tasks_updated_at();
+
+create index if not exists tasks_updated_at_idx on tasks (updated_at);
@@ -0,0 +1,19 @@
+-- Dashboard bucket counts in one aggregate (DASHBOARD_QUERY_MODE = "server").
+-- A NULL due date is treated as due today, matching the pandas bucketing.
+
+create or replace function task_bucket_counts(p_assigned_to text default null, p_today date default current_date)
+returns table (pending bigint, today bigint, tomorrow bigint, overdue bigint, completed bigint)
+language sql stable as $$
+    select
+        count(*) filter (where status is distinct from 'Completed'),
+        count(*) filter (where status is distinct from 'Completed' and coalesce(due_date, p_today) = p_today),
+        count(*) filter (where status is distinct from 'Completed' and due_date = p_today + 1),
+        count(*) filter (where status is distinct from 'Completed' and due_date < p_today),
+        count(*) filter (where status = 'Completed')
+    from tasks
+    where p_assigned_to is null or assigned_to = p_assigned_to;
+$$;
+
+-- Keyset pages in fetch_bucket_page() walk (due_date, id) per assignee.
+create index if not exists tasks_assigned_due_id_idx on tasks (assigned_to, due_date nulls first, id);
+create index if not exists tasks_status_due_id_idx on tasks (status, due_date nulls first, id);
@@ -0,0 +1,32 @@
+-- Ranked full-text search for the Dashboard search box (search_tasks()).
+-- 'simple' config: no stemming or stop words, so names, ticket numbers and
+-- project codes match as typed. Description hits rank above subject/project/
+-- coordinator hits, which rank above remarks and points.
+
+alter table tasks add column if not exists search_doc tsvector generated always as (
+    setweight(to_tsvector('simple', coalesce(task_desc, '')), 'A') ||
+    setweight(to_tsvector('simple', coalesce(email_subject, '') || ' ' || coalesce(project_ref, '') || ' ' ||
+                                    coalesce(coordinator, '')), 'B') ||
+    setweight(to_tsvector('simple', coalesce(staff_remarks, '') || ' ' || coalesce(points, '')), 'C')
+) stored;
+
+create index if not exists tasks_search_doc_idx on tasks using gin (search_doc);
+
+-- Every word must match, each as a prefix so results follow typing.
+create or replace function search_tasks(p_query text, p_assigned_to text default null, p_limit int default 50)
+returns table (id bigint, created_by text, assigned_to text, task_desc text, status text, priority text,
+               due_date date, project_ref text, coordinator text, updated_at timestamptz, rank real)
+language sql stable as $$
+    with q as (
+        select to_tsquery('simple', string_agg(quote_literal(w) || ':*', ' & ')) as query
+        from regexp_split_to_table(lower(trim(p_query)), '\s+') as w
+        where w <> ''
+    )
+    select t.id::bigint, t.created_by, t.assigned_to, t.task_desc, t.status, t.priority, t.due_date::date,
+           t.project_ref, t.coordinator, t.updated_at::timestamptz, ts_rank(t.search_doc, q.query) as rank
+    from tasks t, q
+    where t.search_doc @@ q.query
+      and (p_assigned_to is null or t.assigned_to = p_assigned_to)
+    order by rank desc, t.due_date, t.id
+    limit p_limit;
+$$;
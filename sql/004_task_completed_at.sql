@@ -0,0 +1,32 @@
+-- Completion time for the manager analytics (completion throughput per week).
+-- Stamped when a task moves to Completed and cleared when it is reinstated;
+-- saving an already-completed task keeps its original completion time, and a
+-- completion time supplied on insert (task import) is kept.
+
+alter table tasks add column if not exists completed_at timestamptz;
+
+-- Best guess for tasks completed before this column existed.
+update tasks set completed_at = updated_at where status = 'Completed' and completed_at is null;
+
+create or replace function set_tasks_completed_at() returns trigger as $$
+begin
+    if new.status = 'Completed' then
+        if tg_op = 'INSERT' then
+            -- Imports of already-closed work supply their own completion time.
+            new.completed_at := coalesce(new.completed_at, now());
+        elsif old.status is distinct from 'Completed' then
+            new.completed_at := now();
+        end if;
+    else
+        new.completed_at := null;
+    end if;
+    return new;
+end;
+$$ language plpgsql;
+
+drop trigger if exists tasks_set_completed_at on tasks;
+create trigger tasks_set_completed_at
+    before insert or update of status on tasks
+    for each row execute function set_tasks_completed_at();
+
+create index if not exists tasks_completed_at_idx on tasks (completed_at) where completed_at is not null;
@@ -0,0 +1,58 @@
+-- Completed history outside the working set.
+-- The app only loads open tasks plus those completed in the last
+-- COMPLETED_WINDOW_DAYS. Older completions are paged from task_history on
+-- demand, and archive_completed_tasks() moves long-closed tasks out of
+-- `tasks` in bulk (Team Master button, or schedule it with pg_cron).
+
+create table if not exists tasks_archive (like tasks including defaults including generated);
+alter table tasks_archive add column if not exists archived_at timestamptz not null default now();
+
+-- `like` does not copy the primary key; add it only once so the file can be re-run.
+do $$
+begin
+    if not exists (select 1 from pg_constraint where conrelid = 'tasks_archive'::regclass and contype = 'p') then
+        alter table tasks_archive add primary key (id);
+    end if;
+end $$;
+
+create index if not exists tasks_archive_assigned_completed_idx on tasks_archive (assigned_to, completed_at desc, id desc);
+create index if not exists tasks_archive_completed_idx on tasks_archive (completed_at desc, id desc);
+create index if not exists tasks_completed_history_idx on tasks (completed_at desc, id desc) where status = 'Completed';
+
+create or replace view task_history as
+    select id, created_by, assigned_to, task_desc, status, priority, due_date, project_ref, coordinator,
+           completed_at, updated_at
+    from tasks where status = 'Completed'
+    union all
+    select id, created_by, assigned_to, task_desc, status, priority, due_date, project_ref, coordinator,
+           completed_at, updated_at
+    from tasks_archive;
+
+create or replace function archive_completed_tasks(p_older_than_days int default 180)
+returns bigint
+language sql as $$
+    with moved as (
+        delete from tasks
+        where status = 'Completed' and completed_at < now() - make_interval(days => p_older_than_days)
+        returning id, created_at, updated_at, created_by, assigned_to, task_desc, status, priority, due_date,
+                  project_ref, staff_remarks, manager_remarks, coordinator, email_subject, points, completed_at
+    ), archived as (
+        insert into tasks_archive (id, created_at, updated_at, created_by, assigned_to, task_desc, status, priority,
+                                   due_date, project_ref, staff_remarks, manager_remarks, coordinator, email_subject,
+                                   points, completed_at)
+        select * from moved
+        returning 1
+    )
+    select count(*) from archived;
+$$;
+
+-- Weekly completions for the analytics page, across live and archived tasks.
+create or replace function task_completions_per_week(p_since date)
+returns table (week date, completed bigint)
+language sql stable as $$
+    select date_trunc('week', completed_at)::date as week, count(*)
+    from task_history
+    where completed_at >= p_since
+    group by 1
+    order by 1;
+$$;
@@ -0,0 +1,19 @@
+-- Outbox for the daily digest job (digest.py --outbox).
+-- One row per recipient per day. Re-running the job on the same day replaces
+-- that day's rows; the mailer sets sent_at once a digest has gone out, and
+-- re-runs leave it alone.
+
+create table if not exists digest_outbox (
+    id bigint generated always as identity primary key,
+    recipient text not null,
+    digest_date date not null,
+    subject text not null,
+    body text not null,
+    overdue int not null default 0,
+    due_today int not null default 0,
+    created_at timestamptz not null default now(),
+    sent_at timestamptz,
+    unique (recipient, digest_date)
+);
+
+create index if not exists digest_outbox_unsent_idx on digest_outbox (digest_date) where sent_at is null;